@@ -1,5 +1,5 @@
 """Avatar Creator service entry point."""
 
-from .service import generate_avatar, save_avatar_seed, AvatarSeed
+from .service import generate_avatar, load_avatar_seed, save_avatar_seed, AvatarSeed
 
-__all__ = ["generate_avatar", "save_avatar_seed", "AvatarSeed"]
+__all__ = ["generate_avatar", "load_avatar_seed", "save_avatar_seed", "AvatarSeed"]
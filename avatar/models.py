@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Any, Dict, List, Union
 
 class AvatarSeed(BaseModel):
     """Lightweight descriptor for a generated avatar."""
     playerId: str
     prompt: str
-    clipVector: List[float] = Field(default_factory=list, description="768-dim CLIP vector")
+    clipVector: Union[List[float], Dict[str, Any]] = Field(
+        default_factory=list,
+        description="768-dim CLIP vector, as floats or a common.vecpack object",
+    )
     hair: float = 0.5
     eyes: float = 0.5
     body: float = 0.5
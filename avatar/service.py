@@ -6,6 +6,8 @@ import json
 from pathlib import Path
 from typing import Optional
 
+from common import vecpack
+
 from .models import AvatarSeed
 
 # default local asset directory
@@ -21,13 +23,28 @@ def _generate_clip_vector(prompt: str, image_bytes: bytes | None) -> list[float]
     return vec
 
 
+# on-disk format, see docs/contracts/avatarSeed_v2.md
+SEED_VERSION = 2
+
+
 def save_avatar_seed(seed: AvatarSeed) -> Path:
-    """Save AvatarSeed JSON under DATA_DIR."""
+    """Save an AvatarSeed v2 document under DATA_DIR (``clipVector`` packed as float16)."""
     path = DATA_DIR / f"{seed.playerId}_seed.json"
-    path.write_text(seed.model_dump_json(indent=2), encoding="utf-8")
+    stored = seed.model_copy(update={"clipVector": vecpack.as_format(seed.clipVector, "f16")})
+    doc = {"version": SEED_VERSION, **stored.model_dump()}
+    path.write_text(json.dumps(doc, indent=2), encoding="utf-8")
     return path
 
 
+def load_avatar_seed(player_id: str) -> AvatarSeed | None:
+    """Read a saved AvatarSeed (v1 or v2); ``clipVector`` is returned as a float list."""
+    path = DATA_DIR / f"{player_id}_seed.json"
+    if not path.exists():
+        return None
+    seed = AvatarSeed.model_validate_json(path.read_bytes())
+    return seed.model_copy(update={"clipVector": vecpack.unpack(seed.clipVector)})
+
+
 def create_placeholder_assets(player_id: str) -> tuple[Path, Path]:
     """Generate placeholder GLB and PNG files."""
     glb_path = DATA_DIR / f"{player_id}.glb"
@@ -0,0 +1,90 @@
+"""Content-addressed storage for uploaded files.
+
+Uploads are streamed chunk by chunk into a temp file while their SHA-256 is
+computed, so memory stays constant regardless of size.  The finished file is
+moved to ``<root>/<sha[:2]>/<sha>``; identical bytes are stored once and every
+player path is a hardlink to that blob (a copy where hardlinks are not
+supported).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+
+class UploadTooLarge(ValueError):
+    """Raised once a stream exceeds the store's ``max_bytes``."""
+
+
+@dataclass(frozen=True)
+class Blob:
+    sha256: str
+    size: int
+    path: Path
+
+
+class BlobWriter:
+    """Incremental writer returned by :meth:`BlobStore.open`."""
+
+    def __init__(self, store: BlobStore) -> None:
+        self._store = store
+        self._hash = hashlib.sha256()
+        self.size = 0
+        store.tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self._fh = os.fdopen(fd, "wb")
+        self._tmp = Path(name)
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self._store.max_bytes:
+            self.abort()
+            raise UploadTooLarge(f"upload exceeds {self._store.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._fh.write(chunk)
+
+    def commit(self) -> Blob:
+        """Close the temp file and move it to its content address."""
+        self._fh.close()
+        sha = self._hash.hexdigest()
+        final = self._store.blob_path(sha)
+        if final.exists():
+            self._tmp.unlink()                  # already stored – dedupe
+        else:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp, final)
+        return Blob(sha256=sha, size=self.size, path=final)
+
+    def abort(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class BlobStore:
+    def __init__(self, root: Path, *, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.max_bytes = max_bytes
+
+    def blob_path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha
+
+    def open(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def link(self, blob: Blob, dest: Path) -> None:
+        """Point ``dest`` at ``blob``, replacing whatever was there."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{blob.sha256[:8]}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(blob.path, tmp)
+        except OSError:                         # e.g. cross-device or no hardlinks
+            shutil.copyfile(blob.path, tmp)
+        os.replace(tmp, dest)
@@ -0,0 +1,46 @@
+"""Refuse oversized request bodies before the app reads or spools them."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+from fastapi import HTTPException
+from fastapi.responses import PlainTextResponse
+
+
+class BodyLimitMiddleware:
+    """Pure ASGI middleware; 413 once a body on one of ``paths`` exceeds ``limit()``.
+
+    A too-large ``Content-Length`` is refused without reading anything;
+    otherwise the body is counted as it arrives, so form parsing stops at the
+    limit instead of spooling the whole upload first.  ``limit`` is called per
+    request so it can follow the configured store.
+    """
+
+    def __init__(self, app: Any, *, paths: Iterable[str], limit: Callable[[], int]) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+        self.limit = limit
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        limit = self.limit()
+        detail = f"request body exceeds {limit} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await PlainTextResponse(detail, status_code=413)(scope, receive, send)
+            return
+        seen = 0
+
+        async def _receive() -> dict:
+            nonlocal seen
+            message = await receive()
+            if message["type"] == "http.request":
+                seen += len(message.get("body", b""))
+                if seen > limit:
+                    raise HTTPException(413, detail)
+            return message
+
+        await self.app(scope, _receive, send)
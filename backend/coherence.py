@@ -0,0 +1,103 @@
+"""Cross-process coherence for the file-backed stores.
+
+With ``uvicorn --workers N`` every worker has its own memory but shares the
+JSON files.  Two primitives keep them consistent:
+
+* ``FileLock`` – an advisory ``flock`` on a sidecar ``.lock`` file taken
+  around every read-modify-write, so workers never lose each other's updates.
+* ``VersionedFile`` – an in-process parsed copy of a file keyed by its
+  ``(inode, mtime_ns, size)`` version.  Writers always ``os.replace`` a new
+  file, so any write by any worker changes the version and invalidates every
+  other worker's copy; an unchanged file costs one ``stat`` per read.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Generic, Iterator, TypeVar
+
+try:
+    import fcntl
+except ImportError:                             # pragma: no cover – non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+T = TypeVar("T")
+
+Version = tuple[int, int, int]
+
+
+class FileLock:
+    """Exclusive inter-process lock; threads of one process are serialised too."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def exclusive(self, *, blocking: bool = True) -> Iterator[None]:
+        with self._thread_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+                    fcntl.flock(fd, flags)
+                yield
+            finally:
+                os.close(fd)                    # closing drops the flock
+
+
+def lock_path(path: Path) -> Path:
+    return path.with_name(path.name + ".lock")
+
+
+def file_version(path: Path) -> Version | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class VersionedFile(Generic[T]):
+    """Parsed view of ``path`` that is re-read only when its version changes.
+
+    The returned object is shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self, path: Path, parse: Callable[[bytes], T], fallback: Callable[[], T]
+    ) -> None:
+        self.path = Path(path)
+        self._parse = parse
+        self._fallback = fallback
+        self._lock = threading.Lock()
+        self._version: Version | None = None
+        self._value: T = fallback()
+
+    def get(self) -> T:
+        version = file_version(self.path)           # stat *before* reading
+        if version is not None and version == self._version:
+            return self._value
+        with self._lock:
+            if version is not None and version == self._version:
+                return self._value
+            try:
+                value = self._parse(self.path.read_bytes())
+            except (FileNotFoundError, ValueError):
+                value = self._fallback()
+            self._version, self._value = version, value
+            return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+
+def parse_json_dict(blob: bytes) -> dict[str, Any]:
+    data = json.loads(blob.decode("utf-8") or "{}")
+    return data if isinstance(data, dict) else {}
@@ -0,0 +1,73 @@
+"""Async micro-batcher for embedding requests.
+
+Texts submitted within ``window`` seconds of each other (up to ``max_batch``)
+are sent upstream as one ``embeddings.create(input=[...])`` call and the
+vectors are fanned back out to the waiting callers.  A failed batch fails every
+caller in it, which then fall back exactly as they would for a single call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, List
+
+from common.metrics import REGISTRY
+
+BATCH_SIZE = REGISTRY.histogram(
+    "embedding_batch_size", "Texts per upstream embedding call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+BatchCall = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class MicroBatcher:
+    def __init__(self, call: BatchCall, *, window: float = 0.01, max_batch: int = 64) -> None:
+        self._call = call
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._sending: set[asyncio.Task] = set()       # keep in-flight batches alive
+
+    async def submit(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        self._pending.append((text, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    @staticmethod
+    def _fail(batch: list[tuple[str, asyncio.Future]], exc: BaseException) -> None:
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_exception(exc)
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        BATCH_SIZE.observe(len(unique))
+        try:
+            vectors = await self._call(unique)
+            if len(vectors) != len(unique):
+                raise ValueError(f"expected {len(unique)} vectors, got {len(vectors)}")
+            by_text = dict(zip(unique, vectors))
+            for text, fut in batch:
+                if not fut.done():
+                    fut.set_result(by_text[text])
+        except Exception as exc:                # noqa: BLE001 – fanned out to callers
+            self._fail(batch, exc)
+        finally:                                # cancelled: never leave callers waiting
+            self._fail(batch, RuntimeError("embedding batch was cancelled"))
@@ -0,0 +1,137 @@
+"""Two-tier cache for text embeddings keyed by ``sha256(model, dims, text)``.
+
+* memory – an LRU bounded by bytes (vectors are kept as packed float32)
+* disk   – one ``<dir>/<key[:2]>/<key>.f32`` file per vector, survives restarts
+
+Concurrent misses for the same key share one upstream call.  Hits, misses,
+evictions, resident bytes and the upstream time saved are exported through
+``common.metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+from common.metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter("embedding_cache_hits_total", "Embedding cache hits by tier.")
+CACHE_MISSES = REGISTRY.counter("embedding_cache_misses_total", "Embedding cache misses.")
+CACHE_EVICTIONS = REGISTRY.counter(
+    "embedding_cache_evictions_total", "Vectors evicted from the memory tier."
+)
+CACHE_BYTES = REGISTRY.gauge("embedding_cache_bytes", "Bytes held by the memory tier.")
+CACHE_SAVED = REGISTRY.counter(
+    "embedding_cache_saved_seconds_total", "Estimated upstream latency avoided by hits."
+)
+
+Compute = Callable[[str], Awaitable[List[float]]]
+
+
+def cache_key(model: str, dimensions: int, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{dimensions}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        model: str,
+        dimensions: int,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: Path | None = None,
+    ) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._lru: OrderedDict[str, array] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._miss_latency = 0.0        # EWMA of upstream latency, for "saved"
+
+    # memory tier -----------------------------------------------------
+    def _remember(self, key: str, vec: array) -> None:
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._bytes -= old.itemsize * len(old)
+        self._lru[key] = vec
+        self._bytes += vec.itemsize * len(vec)
+        while self._bytes > self.max_bytes and self._lru:
+            _, evicted = self._lru.popitem(last=False)
+            self._bytes -= evicted.itemsize * len(evicted)
+            CACHE_EVICTIONS.inc()
+        CACHE_BYTES.set(self._bytes)
+
+    # disk tier -------------------------------------------------------
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / key[:2] / f"{key}.f32"
+
+    def _disk_get(self, key: str) -> array | None:
+        try:
+            blob = self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        vec = array("f")
+        vec.frombytes(blob)
+        return vec if len(vec) == self.dimensions else None
+
+    def _disk_put(self, key: str, vec: array) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(vec.tobytes())
+        os.replace(tmp, path)
+
+    # public ----------------------------------------------------------
+    async def get_or_compute(self, text: str, compute: Compute) -> List[float]:
+        """Return the cached vector for ``text`` or compute, store and return it.
+
+        Exceptions from ``compute`` propagate and nothing is cached, so callers
+        keep their own fallback and never poison the cache with it.
+        """
+        key = cache_key(self.model, self.dimensions, text)
+        vec = self._lru.get(key)
+        if vec is not None:
+            self._lru.move_to_end(key)
+            CACHE_HITS.inc(tier="memory")
+            CACHE_SAVED.inc(self._miss_latency)
+            return vec.tolist()
+
+        task = self._inflight.get(key)
+        if task is None:                        # owned by the cache, not by this caller
+            task = asyncio.ensure_future(self._load(key, text, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._settled(key, t))
+        return list(await asyncio.shield(task))  # a cancelled caller leaves the others waiting
+
+    def _settled(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()                    # mark retrieved if every caller went away
+
+    async def _load(self, key: str, text: str, compute: Compute) -> List[float]:
+        vec = await asyncio.to_thread(self._disk_get, key) if self.directory else None
+        if vec is not None:
+            CACHE_HITS.inc(tier="disk")
+            CACHE_SAVED.inc(self._miss_latency)
+        else:
+            CACHE_MISSES.inc()
+            start = time.perf_counter()
+            vec = array("f", await compute(text))
+            elapsed = time.perf_counter() - start
+            self._miss_latency = elapsed if not self._miss_latency else (
+                0.9 * self._miss_latency + 0.1 * elapsed
+            )
+            if self.directory:
+                await asyncio.to_thread(self._disk_put, key, vec)
+        self._remember(key, vec)
+        return vec.tolist()
@@ -0,0 +1,81 @@
+"""Local, dependency-light NLP for the ritual endpoint.
+
+* ``sentiment(text)`` – lexicon scorer returning ``[neg, neu, pos]`` that sums
+  to 1, with simple negation ("not happy" counts as negative).
+* ``embed(text, dims)`` – hashing-trick embedder: unigrams and bigrams are
+  hashed into ``dims`` signed buckets and the result is L2-normalised.  It is
+  deterministic across processes, so equal texts always map to equal vectors.
+
+Both run in microseconds and need no network.  Hashed vectors only capture word
+overlap; they are not comparable with model embeddings of the same width.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z']+")
+_NEGATIONS = frozenset({"not", "no", "never", "nothing", "without", "don't", "can't", "won't", "isn't"})
+
+_POSITIVE = """
+    love loved loving joy joyful happy hope hopeful calm peace peaceful grateful
+    gratitude trust brave courage strong strength light kind kindness warm free
+    freedom grow growth heal healing clear clarity purpose faith glad bright
+    inspire inspired open gentle safe whole alive curious excited wonder wise
+    good great better best beautiful fulfil fulfilled belong connected seek found
+""".split()
+_NEGATIVE = """
+    fear afraid scared anxious anxiety sad sadness lost alone lonely angry anger
+    hate hurt pain broken dark doubt worry worried tired empty shame ashamed guilt
+    guilty stuck trapped weak confused despair grief regret bitter cold numb
+    bad worse worst failure fail failed hopeless helpless ugly rejected abandoned
+""".split()
+_LEXICON = {**{w: 1.0 for w in _POSITIVE}, **{w: -1.0 for w in _NEGATIVE}}
+
+NEUTRAL_PRIOR = 1.0     # pseudo-count that keeps short texts near neutral
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def sentiment(text: str) -> List[float]:
+    """Return ``[neg, neu, pos]`` probabilities for ``text``."""
+    tokens = _tokens(text)
+    if not tokens:
+        return [0.0, 1.0, 0.0]
+    polarity = np.fromiter((_LEXICON.get(t, 0.0) for t in tokens), float, len(tokens))
+    negated = np.fromiter((t in _NEGATIONS for t in tokens), bool, len(tokens))
+    # a negation flips the word that follows it
+    polarity[1:] *= np.where(negated[:-1], -1.0, 1.0)
+    pos = polarity.clip(min=0).sum()
+    neg = -polarity.clip(max=0).sum()
+    neu = NEUTRAL_PRIOR + (len(tokens) - np.count_nonzero(polarity)) / len(tokens)
+    scores = np.array([neg, neu, pos])
+    return (scores / scores.sum()).round(4).tolist()
+
+
+def _hashes(features: List[str]) -> np.ndarray:
+    digests = b"".join(
+        hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features
+    )
+    return np.frombuffer(digests, dtype="<u8")
+
+
+def embed(text: str, dims: int = 768) -> List[float]:
+    """Return a unit-length ``dims``-wide hashed bag-of-ngrams vector."""
+    tokens = _tokens(text) or [""]
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    h = _hashes(features)
+    index = (h % np.uint64(dims)).astype(np.intp)
+    sign = np.where(h >> np.uint64(63), -1.0, 1.0)
+    vec = np.zeros(dims, dtype=np.float32)
+    np.add.at(vec, index, sign)
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec.tolist()
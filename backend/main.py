@@ -4,13 +4,15 @@ backend/main.py – central FastAPI app for SoulSeed
 """
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import json
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Callable, Literal, TypeVar, Union
 
-from fastapi import Body, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import Body, FastAPI, File, Form, HTTPException, Query, UploadFile
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, ConfigDict, constr
@@ -18,35 +20,75 @@ from pydantic import BaseModel, Field, ConfigDict, constr
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 import ritual
+from blobstore import BlobStore, UploadTooLarge
+from body_limit import BodyLimitMiddleware
+from group_commit import GroupCommitWriter
+from state_store import make_state_store
+from story_graph import Scene, StoryGraph, default_render
 from avatar import generate_avatar, AvatarSeed
+from common import vecpack
+from common.metrics import instrument, track
+from common.vecpack import VecFormat
 
 # ─────────────────────────────── paths ───────────────────────────────────────
 BASE_DIR    = Path(__file__).resolve().parent
 DATA_FILE   = BASE_DIR / "player_profile.json"
 STORY_FILE  = BASE_DIR / "story.json"
 STATE_FILE  = BASE_DIR / "player_state.json"
+STATE_DIR   = BASE_DIR / "player_state.d"             # sharded backend
+STATE_DB    = Path(os.getenv("STATE_DB", BASE_DIR / "soulseed.db"))
 EDITOR_FILE = BASE_DIR / "editor.html"
 UPLOADS_DIR = BASE_DIR.parent / "uploads"             # one level above backend/
+# content-addressed originals; outside the /static root so only the per-player
+# hardlinks are public, but on the same filesystem as UPLOADS_DIR
+BLOBS_DIR   = Path(os.getenv("BLOBS_DIR", BASE_DIR.parent / "blobs"))
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "json")    # json | sharded | wal | sqlite
+IO_WORKERS    = int(os.getenv("IO_WORKERS", "4"))     # bounded pool for disk work
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "20"))
+MAX_BATCH_CHOICES = int(os.getenv("MAX_BATCH_CHOICES", "1000"))   # items per /choices/batch
+UPLOAD_CHUNK  = 1024 * 1024
+FORM_OVERHEAD = 64 * 1024                             # multipart headers and small fields
 
 app = FastAPI(title="SoulSeed API")
+instrument(app, "soulseed")
 app.mount("/static", StaticFiles(directory=UPLOADS_DIR, check_dir=False), name="static")
+# Starlette spools the whole multipart body before a handler runs; cap it on the wire
+app.add_middleware(
+    BodyLimitMiddleware,
+    paths=("/avatar/upload", "/avatar/create"),
+    limit=lambda: blob_store.max_bytes + FORM_OVERHEAD,
+)
+
+state_store    = make_state_store(
+    STATE_BACKEND, file=STATE_FILE, directory=STATE_DIR, db=STATE_DB
+)
+profile_writer = GroupCommitWriter(DATA_FILE)          # coalesces /soulseed writes
+_io_pool       = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="soulseed-io")
+blob_store     = BlobStore(BLOBS_DIR, max_bytes=int(MAX_UPLOAD_MB * 1024 * 1024))
 
 @app.on_event("startup")
 async def _init() -> None:
     await ritual.setup()
 
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    await ritual.shutdown()                 # flush queued ritual_logs rows
+    profile_writer.close()
+    state_store.close()
+    _io_pool.shutdown(wait=True)
+
 # ────────────────────────────── helpers ──────────────────────────────────────
-def _read_json(path: Path, fallback: dict[str, Any]) -> dict[str, Any]:
-    if path.exists():
-        try:
-            return json.loads(path.read_text(encoding="utf-8")) or fallback
-        except json.JSONDecodeError:
-            return fallback
-    return fallback
-
-def _write_json(path: Path, data: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+T = TypeVar("T")
+
+async def _run_io(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run blocking file work on the bounded I/O pool, off the event loop."""
+    def call() -> T:
+        with track("file_io", getattr(fn, "__name__", "io")):
+            return fn(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, call)
 
 _slug_re = re.compile(r"[^a-z0-9]+")
 
@@ -77,7 +119,21 @@ class RitualRequest(BaseModel):
 
 class RitualResponse(BaseModel):
     theme: str
-    intentVector: list[float]
+    intentVector: list[float] | dict[str, Any]      # dict: common.vecpack object
+
+class SimilarRitual(BaseModel):
+    id: int
+    playerId: str | None
+    theme: str | None
+    createdAt: str | None
+    distance: float
+
+class SimilarResponse(BaseModel):
+    by: str
+    results: list[SimilarRitual]
+
+SimilarRitual.model_rebuild()
+SimilarResponse.model_rebuild()
 
 class StartRequest(BaseModel):
     soulSeedId: str
@@ -107,9 +163,27 @@ class SceneResponse(BaseModel):
     text: str
     choices: list[dict[str, str]]
 
+class BatchChoiceRequest(BaseModel):
+    items: list[ChoiceRequest] = Field(..., max_length=MAX_BATCH_CHOICES)
+
+class BatchChoiceResult(BaseModel):
+    index: int
+    soulSeedId: str
+    ok: bool
+    scene: SceneResponse | None = None
+    error: str | None = None
+
+class BatchChoiceResponse(BaseModel):
+    applied: int
+    results: list[BatchChoiceResult]
+
+BatchChoiceRequest.model_rebuild()
+BatchChoiceResult.model_rebuild()
+BatchChoiceResponse.model_rebuild()
+
 # ─────────────────────────── liminal ritual endpoint ─────────────────────────
 @app.post("/ritual", response_model=RitualResponse)
-async def api_ritual(payload: RitualRequest) -> RitualResponse:
+async def api_ritual(payload: RitualRequest, vecFormat: VecFormat = "list") -> RitualResponse:
     data = await ritual.record(
         payload.playerId,
         payload.askText,
@@ -117,7 +191,25 @@ async def api_ritual(payload: RitualRequest) -> RitualResponse:
         payload.knockText,
         payload.theme,
     )
-    return RitualResponse(theme=data["theme"], intentVector=data["intentVector"])
+    return RitualResponse(
+        theme=data["theme"], intentVector=vecpack.as_format(data["intentVector"], vecFormat)
+    )
+
+@app.get("/ritual/similar", response_model=SimilarResponse)
+async def api_ritual_similar(
+    playerId: str | None = None,
+    text: str | None = Query(None, max_length=840),
+    k: int = Query(10, ge=1, le=100),
+    by: Literal["rituals", "players"] = "rituals",
+) -> SimilarResponse:
+    """Nearest past rituals (or players) to a player's latest ritual or a text."""
+    if (playerId is None) == (text is None):
+        raise HTTPException(400, "Pass exactly one of playerId or text")
+    try:
+        rows = await ritual.similar(player_id=playerId, text=text, k=k, by=by)
+    except LookupError:
+        raise HTTPException(404, "No rituals for player") from None
+    return SimilarResponse(by=by, results=[SimilarRitual(**r) for r in rows])
 
 # ─────────────────────────── avatar upload ───────────────────────────────────
 @app.post("/avatar/upload")
@@ -125,15 +217,35 @@ async def upload_avatar(
     playerId: str = Form(...),
     file: UploadFile = File(...),
 ) -> dict[str, str]:
-    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
-
     ext       = Path(file.filename).suffix
-    dest_dir  = UPLOADS_DIR / playerId
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    dest      = dest_dir / f"orig_001{ext}"
-    dest.write_bytes(await file.read())
-
-    return {"url": f"/static/{playerId}/{dest.name}"}
+    dest      = UPLOADS_DIR / playerId / f"orig_001{ext}"
+    writer    = await _run_io(blob_store.open)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK):
+            await _run_io(writer.write, chunk)
+    except UploadTooLarge as exc:
+        raise HTTPException(413, str(exc)) from exc
+    except BaseException:
+        await _run_io(writer.abort)
+        raise
+    try:
+        blob = await _run_io(writer.commit)
+    except BaseException:
+        await _run_io(writer.abort)
+        raise
+    await _run_io(blob_store.link, blob, dest)        # same bytes → same inode
+
+    return {"url": f"/static/{playerId}/{dest.name}", "sha256": blob.sha256}
+
+async def _read_limited(upload: UploadFile) -> bytes:
+    """Read an upload fully, refusing anything over ``MAX_UPLOAD_MB``."""
+    parts, size = [], 0
+    while chunk := await upload.read(UPLOAD_CHUNK):
+        size += len(chunk)
+        if size > blob_store.max_bytes:
+            raise HTTPException(413, f"upload exceeds {blob_store.max_bytes} bytes")
+        parts.append(chunk)
+    return b"".join(parts)
 
 class AvatarCreateRequest(BaseModel):
     playerId: str
@@ -154,9 +266,11 @@ async def create_avatar(
     outfit: float = Form(0.5),
     accessories: float = Form(0.5),
     reference: UploadFile | None = File(None),
+    vecFormat: VecFormat = "list",
 ) -> AvatarSeed:
-    image_bytes = await reference.read() if reference else None
-    seed = generate_avatar(
+    image_bytes = await _read_limited(reference) if reference else None
+    seed = await _run_io(
+        generate_avatar,
         player_id=playerId,
         prompt=prompt,
         image_bytes=image_bytes,
@@ -166,60 +280,67 @@ async def create_avatar(
         outfit=outfit,
         accessories=accessories,
     )
+    if vecFormat != "list":
+        seed = seed.model_copy(update={"clipVector": vecpack.as_format(seed.clipVector, vecFormat)})
     return seed
 
 # ────────────────────────── profile / soul-seed ──────────────────────────────
+def _save_profile(player_id: str, profile: dict[str, Any]) -> None:
+    if STATE_BACKEND == "sqlite":                     # one row, same database
+        with track("file_io", "profile_save"):
+            state_store.set("profiles", player_id, profile)
+        return
+
+    def _store(profiles: dict[str, Any]) -> None:
+        profiles[player_id] = profile
+
+    with track("file_io", "profile_save"):
+        profile_writer.commit(_store)                 # returns once durable
+
 @app.post("/soulseed", response_model=SoulSeedResponse)
 def create_player_profile(payload: PlayerProfileIn) -> SoulSeedResponse:
     player_id    = slugify(payload.playerName)
     archetype    = payload.archetypeCustom or payload.archetypePreset
     soul_seed_id = make_soul_seed_id(payload.playerName, archetype)
 
-    profiles            = _read_json(DATA_FILE, {})
-    profiles[player_id] = {
+    _save_profile(player_id, {
         "playerName": payload.playerName,
         "archetype":  archetype,
         "soulSeedId": soul_seed_id,
-    }
-    _write_json(DATA_FILE, profiles)
+    })
 
     return SoulSeedResponse(playerId=player_id,
                             soulSeedId=soul_seed_id,
                             initSceneTag="intro_001")
 
 # ─────────────────────────── story helpers ───────────────────────────────────
-def _scene_to_response(tag: str, story: dict[str, Any]) -> SceneResponse:
-    scene   = story[tag]
-    choices = [
-        {"tag": str(k), "label": v.replace("_", " ").title()}
-        for k, v in scene.get("choices", {}).items()
-    ]
-    return SceneResponse(sceneTag=tag, text=scene["text"], choices=choices)
+def _render_scene(scene: Scene) -> SceneResponse:
+    return SceneResponse(**default_render(scene))
+
+story_graph = StoryGraph(STORY_FILE, render=_render_scene)   # reloads on change
+
+def _scene_to_response(tag: str) -> SceneResponse:
+    return story_graph[tag].response
 
 @app.post("/start", response_model=SceneResponse)
 def api_start(req: StartRequest) -> SceneResponse:
-    story = _read_json(STORY_FILE, {})
     initial_tag = "intro_001"
-    return _scene_to_response(initial_tag, story)
+    return _scene_to_response(initial_tag)
 
 def _choose_py(req: ChoiceRequest) -> SceneResponse:
-    story = _read_json(STORY_FILE, {})
-    state = _read_json(STATE_FILE, {"soulMap": {}})
-
-    scene = story.get(req.sceneTag)
+    scene = story_graph.get(req.sceneTag)
     if scene is None:
         raise HTTPException(404, "Scene not found")
 
-    str_key_map = {str(k): v for k, v in scene.get("choices", {}).items()}
-    key         = str(req.choice_val)
-    if key not in str_key_map:
+    key = str(req.choice_val)
+    if key not in scene.next:
         raise KeyError(f"Choice '{key}' not available")
 
-    next_tag = str_key_map[key]
-    state.setdefault("soulMap", {})[req.soulSeedId] = [next_tag]
-    _write_json(STATE_FILE, state)
+    next_tag = scene.next[key]
+    with track("file_io", "state_set"):
+        state_store.set("soulMap", req.soulSeedId, [next_tag])
 
-    return _scene_to_response(next_tag, story)
+    return _scene_to_response(next_tag)
 
 @app.post("/choice",  response_model=SceneResponse)
 @app.post("/choose", response_model=SceneResponse)
@@ -229,16 +350,47 @@ def api_choose(req: ChoiceRequest = Body(...)) -> SceneResponse:        # noqa:
     except KeyError as exc:                                             # → 400
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+@app.post("/choices/batch", response_model=BatchChoiceResponse)
+def api_choose_batch(req: BatchChoiceRequest) -> BatchChoiceResponse:
+    """Validate an ordered list of choices in one pass and commit them once."""
+    scenes  = story_graph.refresh()                   # one consistent snapshot
+    latest: dict[str, list[str]] = {}
+    results = []
+    for i, item in enumerate(req.items):
+        scene = scenes.get(item.sceneTag)
+        key   = str(item.choice_val)
+        if scene is None:
+            error = "Scene not found"
+        elif key not in scene.next:
+            error = f"Choice '{key}' not available"
+        elif scene.next[key] not in scenes:
+            error = f"Scene '{scene.next[key]}' not found"
+        else:
+            next_scene = scenes[scene.next[key]]
+            latest[item.soulSeedId] = [next_scene.tag]   # later items win
+            results.append(BatchChoiceResult(
+                index=i, soulSeedId=item.soulSeedId, ok=True, scene=next_scene.response,
+            ))
+            continue
+        results.append(BatchChoiceResult(
+            index=i, soulSeedId=item.soulSeedId, ok=False, error=error,
+        ))
+
+    if latest:
+        with track("file_io", "state_set_many"):
+            state_store.set_many("soulMap", latest)
+    return BatchChoiceResponse(applied=sum(r.ok for r in results), results=results)
+
 # ─────────────────────────── trust & reset ───────────────────────────────────
 @app.get("/trust")
 def api_trust(soulSeedId: str) -> dict[str, float]:
-    st = _read_json(STATE_FILE, {"trust": {}}).get("trust", {})
-    return {"trust": float(st.get(soulSeedId, 0))}
+    with track("file_io", "state_get"):
+        trust = state_store.get("trust", soulSeedId, 0)
+    return {"trust": float(trust)}
 
 def _reset(soul_seed_id: str) -> None:
-    state = _read_json(STATE_FILE, {"soulMap": {}})
-    state["soulMap"].pop(soul_seed_id, None)
-    _write_json(STATE_FILE, state)
+    with track("file_io", "state_delete"):
+        state_store.delete("soulMap", soul_seed_id)
 
 @app.post("/reset")
 def api_reset(soulSeedId: str | None = Form(default=None)) -> dict[str, bool]:
@@ -0,0 +1,192 @@
+"""Embedded SQLite engine for profiles, player state and trust.
+
+One ``kv(ns, key, value)`` table in WAL mode replaces the whole-document JSON
+files: ``ns`` is the JSON section (``soulMap``, ``trust``, ``profiles``) and
+``value`` the JSON-encoded entry.  Lookups hit the primary-key index, writes
+touch only their rows and several uvicorn workers can share one database.
+
+Import the existing JSON files with::
+
+    python backend/sqlite_store.py migrate --db backend/soulseed.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Mapping
+
+from state_store import DELETE, Mutator, StateStore, read_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns    TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID
+"""
+# fixed statement texts so sqlite3's statement cache keeps them prepared
+_GET = "SELECT value FROM kv WHERE ns = ? AND key = ?"
+_PUT = (
+    "INSERT INTO kv (ns, key, value) VALUES (?, ?, ?) "
+    "ON CONFLICT (ns, key) DO UPDATE SET value = excluded.value"
+)
+_DEL = "DELETE FROM kv WHERE ns = ? AND key = ?"
+_SCAN = "SELECT key, value FROM kv WHERE ns = ?"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class SqliteKV:
+    """Thread-safe access to the ``kv`` table; one connection per thread."""
+
+    def __init__(self, path: Path, *, busy_timeout_ms: int = 5000) -> None:
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._opened: list[sqlite3.Connection] = []
+        self._opened_lock = threading.Lock()
+        self._conn().execute(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, cached_statements=64, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._opened_lock:
+                self._opened.append(conn)
+        return conn
+
+    def get(self, ns: str, key: str, default: Any = None) -> Any:
+        row = self._conn().execute(_GET, (ns, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def items(self, ns: str) -> Iterator[tuple[str, Any]]:
+        for key, value in self._conn().execute(_SCAN, (ns,)):
+            yield key, json.loads(value)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")             # take the write lock up front
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def update_many(self, ns: str, updates: Mapping[str, Mutator]) -> None:
+        with self.transaction() as conn:
+            for key, fn in updates.items():
+                row = conn.execute(_GET, (ns, key)).fetchone()
+                new = fn(json.loads(row[0]) if row else None)
+                if new is DELETE:
+                    conn.execute(_DEL, (ns, key))
+                else:
+                    conn.execute(_PUT, (ns, key, _dumps(new)))
+
+    def put_many(self, ns: str, items: Mapping[str, Any]) -> None:
+        with self.transaction() as conn:
+            conn.executemany(_PUT, [(ns, k, _dumps(v)) for k, v in items.items()])
+
+    def close(self) -> None:
+        with self._opened_lock:
+            conns, self._opened = self._opened, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+_shared: dict[Path, SqliteKV] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_kv(path: Path) -> SqliteKV:
+    """One process-wide :class:`SqliteKV` per database file, for short-lived callers."""
+    key = Path(path).resolve()
+    with _shared_lock:
+        kv = _shared.get(key)
+        if kv is None:
+            kv = _shared[key] = SqliteKV(key)
+        return kv
+
+
+class SqliteStateStore(StateStore):
+    """``StateStore`` on top of :class:`SqliteKV` (``STATE_BACKEND=sqlite``)."""
+
+    def __init__(self, path: Path) -> None:
+        self.kv = SqliteKV(path)
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        return self.kv.get(section, key, default)
+
+    def update_many(self, section: str, updates: Mapping[str, Mutator]) -> None:
+        self.kv.update_many(section, updates)
+
+    def close(self) -> None:
+        self.kv.close()
+
+
+# ───────────────────────────────── migration ─────────────────────────────────
+def migrate(
+    db: Path, *, profiles: Path, state: Path, trust: Path | None = None
+) -> dict[str, int]:
+    """Import the JSON documents into ``db``; returns row counts per namespace."""
+    kv = SqliteKV(db)
+    counts: dict[str, int] = {}
+
+    def put(ns: str, items: Mapping[str, Any]) -> None:
+        if items:
+            kv.put_many(ns, items)
+            counts[ns] = counts.get(ns, 0) + len(items)
+
+    prof = read_json(profiles, {})
+    put("profiles", prof if isinstance(prof, dict) else {})
+
+    for path in filter(None, (state, trust)):
+        doc = read_json(path, {})
+        if not isinstance(doc, dict):
+            continue
+        # player_state.json is {section: {key: value}}; a TrustManager file is
+        # the flat {player: trust} form and both may share one file
+        flat = {k: v for k, v in doc.items() if isinstance(v, (int, float))}
+        put("trust", flat)
+        for section, entries in doc.items():
+            if isinstance(entries, dict):
+                put(section, entries)
+    kv.close()
+    return counts
+
+
+def _cli() -> None:
+    here = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="SQLite storage tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    mig = sub.add_parser("migrate", help="import the JSON stores into SQLite")
+    mig.add_argument("--db", type=Path, default=here / "soulseed.db")
+    mig.add_argument("--profiles", type=Path, default=here / "player_profile.json")
+    mig.add_argument("--state", type=Path, default=here / "player_state.json")
+    mig.add_argument("--trust", type=Path, default=None, help="TrustManager JSON file")
+    args = parser.parse_args()
+
+    counts = migrate(args.db, profiles=args.profiles, state=args.state, trust=args.trust)
+    for ns, n in sorted(counts.items()):
+        print(f"{ns:10} {n:6d} rows")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,189 @@
+"""Pluggable, keyed storage for per-player backend state.
+
+State is addressed as ``(section, key)`` – e.g. ``("soulMap", soulSeedId)`` or
+``("trust", soulSeedId)``.  Two engines are provided:
+
+* ``JsonStateStore``    – today's single ``player_state.json`` document,
+  written through a ``group_commit.GroupCommitWriter``.
+* ``ShardedStateStore`` – one small JSON file per player, so a write costs
+  O(1) in the number of players and unrelated players never contend.
+
+Both are safe to share between several uvicorn workers (see ``coherence``).
+
+``wal_store.WalStateStore`` adds an append-only log on top of the JSON layout and
+``sqlite_store.SqliteStateStore`` keeps one indexed row per key.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Mapping
+
+#: returned by an ``update`` callback to remove the key
+DELETE = object()
+
+Mutator = Callable[[Any], Any]
+
+
+def atomic_write_json(
+    path: Path, data: Any, *, indent: int | None = 2, fsync: bool = False
+) -> None:
+    """Write ``data`` to ``path`` via a temp file + ``os.replace``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=indent)
+            if fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def read_json(path: Path, fallback: Any) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")) or fallback
+    except (FileNotFoundError, json.JSONDecodeError):
+        return fallback
+
+
+class StateStore(ABC):
+    """Keyed player state with atomic per-key read-modify-write."""
+
+    @abstractmethod
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        """Return the value stored under ``(section, key)``."""
+
+    @abstractmethod
+    def update_many(self, section: str, updates: Mapping[str, Mutator]) -> None:
+        """Apply ``fn(old) -> new`` for every key as one atomic commit."""
+
+    def update(self, section: str, key: str, fn: Mutator) -> None:
+        self.update_many(section, {key: fn})
+
+    def set(self, section: str, key: str, value: Any) -> None:
+        self.update(section, key, lambda _old: value)
+
+    def set_many(self, section: str, items: Mapping[str, Any]) -> None:
+        self.update_many(section, {k: (lambda _old, v=v: v) for k, v in items.items()})
+
+    def delete(self, section: str, key: str) -> None:
+        self.update(section, key, lambda _old: DELETE)
+
+    def close(self) -> None:
+        """Flush and release resources; a no-op for write-through engines."""
+
+
+# ───────────────────────────── single document ───────────────────────────────
+class JsonStateStore(StateStore):
+    """``{section: {key: value}}`` in one JSON file (compatible with today)."""
+
+    def __init__(self, path: Path, *, window: float = 0.002) -> None:
+        from group_commit import GroupCommitWriter
+
+        self.path = Path(path)
+        self._writer = GroupCommitWriter(self.path, window=window)
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        node = self._writer.read().get(section)
+        return node.get(key, default) if isinstance(node, dict) else default
+
+    def update_many(self, section: str, updates: Mapping[str, Mutator]) -> None:
+        def apply(data: dict[str, Any]) -> None:
+            node = data.get(section)
+            if not isinstance(node, dict):
+                node = data[section] = {}
+            for key, fn in updates.items():
+                new = fn(node.get(key))
+                if new is DELETE:
+                    node.pop(key, None)
+                else:
+                    node[key] = new
+
+        # concurrent updates share one fsynced rewrite of the file
+        self._writer.commit(apply)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+# ─────────────────────────────── per player ──────────────────────────────────
+_safe_re = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class ShardedStateStore(StateStore):
+    """One ``<key>.json`` shard per player holding ``{section: value}``.
+
+    Writers take one of ``stripes`` flock-ed lock files, so keys are updated
+    atomically across threads and uvicorn workers alike.
+    """
+
+    def __init__(self, directory: Path, *, stripes: int = 64) -> None:
+        from coherence import FileLock
+
+        self.directory = Path(directory)
+        self._stripes = [
+            FileLock(self.directory / ".locks" / f"{i:02x}.lock") for i in range(stripes)
+        ]
+
+    def _shard(self, key: str) -> Path:
+        name = key if _safe_re.fullmatch(key) else hashlib.sha256(key.encode()).hexdigest()
+        return self.directory / name[:2] / f"{name}.json"
+
+    def _key_lock(self, key: str) -> ContextManager[None]:
+        return self._stripes[zlib.crc32(key.encode()) % len(self._stripes)].exclusive()
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        record = read_json(self._shard(key), {})
+        return record.get(section, default) if isinstance(record, dict) else default
+
+    def update_many(self, section: str, updates: Mapping[str, Mutator]) -> None:
+        # shards are independent files; each key is committed atomically
+        for key, fn in updates.items():
+            with self._key_lock(key):
+                path = self._shard(key)
+                record = read_json(path, {})
+                if not isinstance(record, dict):
+                    record = {}
+                new = fn(record.get(section))
+                if new is DELETE:
+                    record.pop(section, None)
+                else:
+                    record[section] = new
+                if record:
+                    atomic_write_json(path, record, indent=None)
+                else:
+                    path.unlink(missing_ok=True)
+
+
+def make_state_store(
+    kind: str, *, file: Path, directory: Path, db: Path | None = None
+) -> StateStore:
+    """Build the engine named by ``STATE_BACKEND``.
+
+    ``json``, ``sharded``, ``wal`` or ``sqlite`` (``db`` defaults to ``file``
+    with a ``.db`` suffix).
+    """
+    if kind == "json":
+        return JsonStateStore(file)
+    if kind == "sharded":
+        return ShardedStateStore(directory)
+    if kind == "wal":
+        from wal_store import WalStateStore
+
+        return WalStateStore(file)
+    if kind == "sqlite":
+        from sqlite_store import SqliteStateStore
+
+        return SqliteStateStore(db or file.with_suffix(".db"))
+    raise ValueError(f"unknown state backend '{kind}'")
@@ -0,0 +1,121 @@
+"""Compiled, in-memory view of ``story.json`` with hot reload."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Scene:
+    """Immutable scene record; ``response`` is rendered once at compile time."""
+
+    tag: str
+    text: str
+    next: Mapping[str, str]
+    response: Any
+
+
+def _label(value: str) -> str:
+    return value.replace("_", " ").title()
+
+
+def default_render(scene: Scene) -> dict[str, Any]:
+    return {
+        "sceneTag": scene.tag,
+        "text": scene.text,
+        "choices": [{"tag": k, "label": _label(v)} for k, v in scene.next.items()],
+    }
+
+
+class StoryGraph:
+    """Load ``story.json`` once and reload only when its content changes.
+
+    Every lookup does a single ``stat``; the file is re-read when mtime or size
+    differ and re-compiled only if the SHA-256 of the bytes differs too.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        render: Callable[[Scene], Any] = default_render,
+    ) -> None:
+        self.path = Path(path)
+        self._render = render
+        self._lock = threading.Lock()
+        self._stat: tuple[int, int] | None = None
+        self._digest: str | None = None
+        self._scenes: Mapping[str, Scene] = MappingProxyType({})
+
+    # loading ---------------------------------------------------------
+    def _compile(self, raw: dict[str, Any]) -> Mapping[str, Scene]:
+        scenes: dict[str, Scene] = {}
+        for tag, body in raw.items():
+            if not isinstance(body, dict):
+                continue
+            nxt = MappingProxyType(
+                {str(k): str(v) for k, v in (body.get("choices") or {}).items()}
+            )
+            draft = Scene(tag=tag, text=body.get("text", ""), next=nxt, response=None)
+            scenes[tag] = replace(draft, response=self._render(draft))
+        return MappingProxyType(scenes)
+
+    def _current_stat(self) -> tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self) -> Mapping[str, Scene]:
+        """Return the compiled scenes, reloading if the file changed."""
+        stat = self._current_stat()
+        if stat == self._stat:
+            return self._scenes
+        with self._lock:
+            if stat == self._stat:
+                return self._scenes
+            if stat is None:
+                self._digest, self._scenes = None, MappingProxyType({})
+            else:
+                blob = self.path.read_bytes()
+                digest = hashlib.sha256(blob).hexdigest()
+                if digest != self._digest:
+                    try:
+                        raw = json.loads(blob.decode("utf-8")) or {}
+                    except ValueError as exc:       # half-written or broken edit
+                        log.error("keeping previous story graph: %s", exc)
+                        return self._scenes         # _stat untouched: retried next lookup
+                    self._scenes = self._compile(raw if isinstance(raw, dict) else {})
+                    self._digest = digest
+            self._stat = stat
+            return self._scenes
+
+    # lookup ----------------------------------------------------------
+    @property
+    def digest(self) -> str | None:
+        self.refresh()
+        return self._digest
+
+    def get(self, tag: str) -> Scene | None:
+        return self.refresh().get(tag)
+
+    def __getitem__(self, tag: str) -> Scene:
+        return self.refresh()[tag]
+
+    def __contains__(self, tag: object) -> bool:
+        return tag in self.refresh()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.refresh())
+
+    def __len__(self) -> int:
+        return len(self.refresh())
@@ -0,0 +1,37 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+APP_PATH = ROOT / "backend" / "main.py"
+
+
+def _load_main():
+    spec = importlib.util.spec_from_file_location("main", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def load_main():
+    """Load a fresh ``backend/main.py`` with its configured paths."""
+    return _load_main
+
+
+@pytest.fixture
+def import_main(tmp_path):
+    """Load a fresh ``backend/main.py`` whose state, uploads and blobs live in ``tmp_path``."""
+
+    def load(max_bytes=1024):
+        module = _load_main()
+        module.state_store = module.make_state_store(
+            "json", file=tmp_path / "state.json", directory=tmp_path / "shards"
+        )
+        module.UPLOADS_DIR = tmp_path / "uploads"
+        module.BLOBS_DIR = tmp_path / "blobs"
+        module.blob_store = module.BlobStore(module.BLOBS_DIR, max_bytes=max_bytes)
+        return module
+
+    return load
@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+
+def test_batch_applies_valid_items_in_one_commit(import_main, monkeypatch):
+    main = import_main()
+    commits = []
+    real = main.state_store.update_many
+    monkeypatch.setattr(
+        main.state_store, "update_many", lambda *a: (commits.append(a), real(*a))
+    )
+    client = TestClient(main.app)
+
+    resp = client.post("/choices/batch", json={"items": [
+        {"soulSeedId": "abc", "sceneTag": "intro_001", "choiceTag": "1"},
+        {"soulSeedId": "abc", "sceneTag": "mysterious_cave", "choice": 2},
+        {"soulSeedId": "xyz", "sceneTag": "intro_001", "tag": "99"},
+        {"soulSeedId": "xyz", "sceneTag": "nowhere", "choiceTag": "1"},
+    ]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["applied"] == 2
+    oks = [r["ok"] for r in body["results"]]
+    assert oks == [True, True, False, False]
+    assert body["results"][1]["scene"]["sceneTag"] == "run_away"
+    assert body["results"][2]["error"] == "Choice '99' not available"
+    assert body["results"][3]["error"] == "Scene not found"
+
+    assert len(commits) == 1
+    assert main.state_store.get("soulMap", "abc") == ["run_away"]
+    assert main.state_store.get("soulMap", "xyz") is None
+
+
+def test_batch_size_is_capped(import_main):
+    main = import_main()
+    client = TestClient(main.app)
+    item = {"soulSeedId": "abc", "sceneTag": "intro_001", "choiceTag": "1"}
+    resp = client.post("/choices/batch", json={"items": [item] * (main.MAX_BATCH_CHOICES + 1)})
+    assert resp.status_code == 422
@@ -0,0 +1,44 @@
+import json
+import multiprocessing
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+import coherence  # noqa: E402
+import state_store  # noqa: E402
+
+
+def _bump(kind, file, directory, n):
+    sys.path.insert(0, str(ROOT / "backend"))
+    store = state_store.make_state_store(kind, file=Path(file), directory=Path(directory))
+    for _ in range(n):
+        store.update("trust", "shared", lambda old: (old or 0) + 1)
+    store.close()
+
+
+def test_workers_do_not_lose_updates(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    for kind in ("json", "sharded"):
+        args = (kind, str(tmp_path / f"{kind}.json"), str(tmp_path / kind), 15)
+        procs = [ctx.Process(target=_bump, args=args) for _ in range(3)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        store = state_store.make_state_store(kind, file=Path(args[1]), directory=Path(args[2]))
+        assert store.get("trust", "shared") == 45, kind
+
+
+def test_versioned_file_sees_other_writers(tmp_path):
+    path = tmp_path / "doc.json"
+    state_store.atomic_write_json(path, {"a": 1})
+    view = coherence.VersionedFile(path, coherence.parse_json_dict, dict)
+    first = view.get()
+    assert view.get() is first                  # served from memory
+
+    # another worker replaces the file
+    state_store.atomic_write_json(path, {"a": 2})
+    assert view.get() == {"a": 2}
+    assert json.loads(path.read_text()) == {"a": 2}
@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+from embedding_batcher import MicroBatcher  # noqa: E402
+
+
+class Upstream:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(0.005)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [[float(len(t))] * 2 for t in texts]
+
+
+def test_concurrent_texts_share_one_call():
+    upstream = Upstream()
+    batcher = MicroBatcher(upstream, window=0.02, max_batch=64)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(t) for t in ["a", "bb", "a", "ccc"]))
+
+    assert asyncio.run(run()) == [[1.0] * 2, [2.0] * 2, [1.0] * 2, [3.0] * 2]
+    assert upstream.batches == [["a", "bb", "ccc"]]
+
+
+def test_max_batch_flushes_without_waiting_for_window():
+    upstream = Upstream()
+    batcher = MicroBatcher(upstream, window=10.0, max_batch=2)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(t) for t in ["a", "b", "c", "d"])), 1.0
+        )
+
+    assert len(asyncio.run(run())) == 4
+    assert upstream.batches == [["a", "b"], ["c", "d"]]
+
+
+def test_failure_reaches_every_caller():
+    batcher = MicroBatcher(Upstream(fail=True), window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.submit("c"))
+
+
+def test_cancelled_batch_fails_its_callers():
+    batcher = MicroBatcher(Upstream(), window=0.0)
+
+    async def run():
+        caller = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.001)              # batch is in flight
+        for task in list(batcher._sending):
+            task.cancel()
+        return await asyncio.wait_for(caller, 1.0)
+
+    with pytest.raises(RuntimeError, match="cancelled"):
+        asyncio.run(run())
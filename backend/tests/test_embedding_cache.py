@@ -0,0 +1,77 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+from embedding_cache import EmbeddingCache  # noqa: E402
+
+
+class Upstream:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(0.01)
+        return [float(len(text))] * 4
+
+
+def test_hits_skip_upstream_and_share_inflight():
+    cache = EmbeddingCache("m", 4)
+    upstream = Upstream()
+
+    async def run():
+        a, b = await asyncio.gather(
+            cache.get_or_compute("ask", upstream), cache.get_or_compute("ask", upstream)
+        )
+        c = await cache.get_or_compute("ask", upstream)
+        return a, b, c
+
+    a, b, c = asyncio.run(run())
+    assert a == b == c == [3.0] * 4
+    assert upstream.calls == ["ask"]
+
+
+def test_disk_tier_survives_restart_and_lru_evicts(tmp_path):
+    upstream = Upstream()
+    cache = EmbeddingCache("m", 4, max_bytes=2 * 4 * 4, directory=tmp_path)
+    for text in ("a", "bb", "ccc"):
+        asyncio.run(cache.get_or_compute(text, upstream))
+    assert len(cache._lru) == 2                 # "a" evicted from memory only
+
+    fresh = EmbeddingCache("m", 4, directory=tmp_path)
+    assert asyncio.run(fresh.get_or_compute("a", upstream)) == [1.0] * 4
+    assert upstream.calls == ["a", "bb", "ccc"]
+
+
+def test_failures_are_not_cached():
+    cache = EmbeddingCache("m", 4)
+
+    async def broken(text):
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("x", broken))
+    assert asyncio.run(cache.get_or_compute("x", Upstream())) == [1.0] * 4
+
+
+def test_cancelled_first_caller_does_not_cancel_the_others():
+    cache = EmbeddingCache("m", 4)
+    upstream = Upstream()
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_compute("ask", upstream))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(cache.get_or_compute("ask", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == [3.0] * 4
+    assert upstream.calls == ["ask"]
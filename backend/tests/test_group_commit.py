@@ -0,0 +1,73 @@
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+import group_commit  # noqa: E402
+
+
+def test_concurrent_mutations_share_writes(tmp_path, monkeypatch):
+    path = tmp_path / "profiles.json"
+    writes = []
+    real = group_commit.atomic_write_json
+
+    def counting(*args, **kwargs):
+        writes.append(1)
+        real(*args, **kwargs)
+
+    monkeypatch.setattr(group_commit, "atomic_write_json", counting)
+    writer = group_commit.GroupCommitWriter(path, window=0.05)
+
+    def add(i):
+        def fn(doc):
+            doc[f"p{i}"] = i
+            return i
+
+        return writer.commit(fn)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(add, range(32)))
+    writer.close()
+
+    assert results == list(range(32))
+    assert json.loads(path.read_text()) == {f"p{i}": i for i in range(32)}
+    assert len(writes) < 32
+
+
+def test_failing_mutation_only_fails_its_caller(tmp_path):
+    writer = group_commit.GroupCommitWriter(tmp_path / "doc.json", window=0.01)
+
+    def boom(doc):
+        raise ValueError("bad")
+
+    bad = writer.submit(boom)
+    good = writer.submit(lambda doc: doc.setdefault("ok", True))
+    with pytest.raises(ValueError):
+        bad.result()
+    assert good.result() is True
+    writer.close()
+
+
+def test_failing_mutation_leaves_no_partial_edit(tmp_path):
+    path = tmp_path / "doc.json"
+    writer = group_commit.GroupCommitWriter(path, window=0.05)
+
+    def half_done(doc):
+        doc["a"] = 1
+        doc.setdefault("nested", {})["b"] = 2
+        raise ValueError("bad")
+
+    first = writer.submit(lambda doc: doc.setdefault("kept", True))
+    bad = writer.submit(half_done)
+    last = writer.submit(lambda doc: sorted(doc))
+    with pytest.raises(ValueError):
+        bad.result()
+    assert first.result() is True
+    assert last.result() == ["kept"]
+    writer.close()
+    assert json.loads(path.read_text()) == {"kept": True}
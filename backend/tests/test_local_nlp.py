@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+import local_nlp  # noqa: E402
+
+
+def test_sentiment_polarity_and_negation():
+    neg, neu, pos = local_nlp.sentiment("I feel hopeful and grateful")
+    assert pos > neg and abs(neg + neu + pos - 1) < 1e-3
+    neg, _, pos = local_nlp.sentiment("I am not happy, I feel lost")
+    assert neg > pos
+    assert local_nlp.sentiment("") == [0.0, 1.0, 0.0]
+
+
+def test_embedding_is_deterministic_unit_and_overlap_aware():
+    a = np.array(local_nlp.embed("ask seek knock", 768))
+    assert a.shape == (768,)
+    assert abs(np.linalg.norm(a) - 1) < 1e-5
+    assert np.array_equal(a, local_nlp.embed("Ask, seek, knock!", 768))
+    near = np.array(local_nlp.embed("ask seek knock door", 768))
+    far = np.array(local_nlp.embed("completely unrelated words here", 768))
+    assert a @ near > a @ far
+    assert np.linalg.norm(local_nlp.embed("", 768)) > 0
+
+
+def test_local_engine_skips_network(monkeypatch):
+    import ritual
+
+    async def boom(text):
+        raise AssertionError("remote called")
+
+    rows = []
+
+    async def sink(batch):
+        rows.extend(batch)
+
+    monkeypatch.setattr(ritual, "RITUAL_ENGINE", "local")
+    monkeypatch.setattr(ritual, "_remote_vectors", boom)
+    monkeypatch.setattr(ritual._log_queue, "_sink", sink)
+
+    async def run():
+        out = await ritual.record("p1", "ask", "seek", "knock", "growth")
+        await ritual._log_queue.close()
+        return out
+
+    out = asyncio.run(run())
+    assert len(out["intentVector"]) == ritual.EMBED_DIMS
+    assert rows and rows[0][:5] == ("p1", "ask", "seek", "knock", "growth")
@@ -0,0 +1,41 @@
+import importlib.util
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[2]
+APP_PATH = ROOT / "backend" / "main.py"
+
+
+def import_main():
+    spec = importlib.util.spec_from_file_location("main", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_similar_validates_and_forwards(monkeypatch):
+    main = import_main()
+    calls = []
+
+    async def fake_similar(**kw):
+        calls.append(kw)
+        if kw["player_id"] == "ghost":
+            raise LookupError("ghost")
+        return [{"id": 7, "playerId": "p2", "theme": "growth",
+                 "createdAt": None, "distance": 0.125}]
+
+    monkeypatch.setattr(main.ritual, "similar", fake_similar)
+    client = TestClient(main.app)
+
+    assert client.get("/ritual/similar").status_code == 400
+    assert client.get("/ritual/similar", params={"playerId": "p", "text": "t"}).status_code == 400
+    assert client.get("/ritual/similar", params={"playerId": "ghost"}).status_code == 404
+    assert client.get("/ritual/similar", params={"text": "t", "k": 0}).status_code == 422
+
+    resp = client.get("/ritual/similar", params={"playerId": "p1", "k": 3, "by": "players"})
+    assert resp.status_code == 200
+    assert resp.json() == {"by": "players", "results": [
+        {"id": 7, "playerId": "p2", "theme": "growth", "createdAt": None, "distance": 0.125}
+    ]}
+    assert calls[-1] == {"player_id": "p1", "text": None, "k": 3, "by": "players"}
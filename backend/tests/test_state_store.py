@@ -0,0 +1,136 @@
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+import state_store  # noqa: E402
+import sqlite_store  # noqa: E402
+from wal_store import WalStateStore  # noqa: E402
+
+
+@pytest.fixture(params=["json", "sharded", "sqlite"])
+def store(request, tmp_path):
+    return state_store.make_state_store(
+        request.param, file=tmp_path / "state.json", directory=tmp_path / "shards"
+    )
+
+
+def test_set_get_delete(store):
+    store.set("soulMap", "abc", ["intro_001"])
+    store.set("trust", "abc", 5)
+    assert store.get("soulMap", "abc") == ["intro_001"]
+    assert store.get("trust", "abc") == 5
+    store.delete("soulMap", "abc")
+    assert store.get("soulMap", "abc") is None
+    assert store.get("trust", "abc") == 5
+
+
+def test_concurrent_updates_are_not_lost(store):
+    def bump():
+        for _ in range(20):
+            store.update("trust", "p", lambda old: (old or 0) + 1)
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.get("trust", "p") == 80
+
+
+def test_json_layout_is_compatible(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({"trust": {"demo": -5}}), encoding="utf-8")
+    store = state_store.JsonStateStore(path)
+    assert store.get("trust", "demo") == -5
+    store.set("soulMap", "abc", ["dark_forest"])
+    assert json.loads(path.read_text()) == {
+        "trust": {"demo": -5},
+        "soulMap": {"abc": ["dark_forest"]},
+    }
+
+
+def test_wal_replays_log_after_crash(tmp_path):
+    snapshot = tmp_path / "state.json"
+    snapshot.write_text(json.dumps({"trust": {"demo": 3}}), encoding="utf-8")
+    wal = WalStateStore(snapshot, exclusive=False)
+    wal.set("soulMap", "abc", ["dark_forest"])
+    wal.delete("trust", "demo")
+    # simulate a crash: the snapshot is untouched, the log holds the tail
+    assert json.loads(snapshot.read_text()) == {"trust": {"demo": 3}}
+    with wal.log.open("ab") as fh:
+        fh.write(b'{"op":"set","s":"soulMap","k":"x"')   # torn record
+
+    again = WalStateStore(snapshot)
+    assert again.get("soulMap", "abc") == ["dark_forest"]
+    assert again.get("trust", "demo") is None
+    assert again.get("soulMap", "x") is None
+    again.set("trust", "demo", 1)
+
+    again.close()
+    assert json.loads(snapshot.read_text()) == {
+        "trust": {"demo": 1},
+        "soulMap": {"abc": ["dark_forest"]},
+    }
+    assert wal.log.stat().st_size == 0
+
+
+def test_wal_fsync_failure_reaches_the_writer(tmp_path, monkeypatch):
+    wal = WalStateStore(tmp_path / "state.json", exclusive=False)
+
+    def broken(fd):
+        raise OSError(5, "I/O error")
+
+    monkeypatch.setattr("wal_store.os.fsync", broken)
+    with pytest.raises(RuntimeError, match="write-ahead log failed"):
+        wal.set("trust", "demo", 1)
+    with pytest.raises(RuntimeError):                   # and the store stays failed
+        wal.set("trust", "demo", 2)
+
+
+def test_wal_raising_mutator_changes_nothing(tmp_path):
+    wal = WalStateStore(tmp_path / "state.json", exclusive=False)
+    wal.set("trust", "a", 1)
+    size = wal.log.stat().st_size
+
+    def boom(_):
+        raise ValueError("bad update")
+
+    with pytest.raises(ValueError):
+        wal.update_many("trust", {"a": lambda v: v + 1, "b": boom})
+    with pytest.raises(TypeError):                      # not JSON-serialisable
+        wal.update_many("trust", {"a": lambda v: v + 1, "b": lambda v: object()})
+    assert wal.get("trust", "a") == 1
+    assert wal.get("trust", "b") is None
+    assert wal.log.stat().st_size == size
+    wal.close()
+
+
+def test_sqlite_migration_imports_json(tmp_path):
+    profiles = tmp_path / "profiles.json"
+    state = tmp_path / "state.json"
+    profiles.write_text(json.dumps({"aim": {"soulSeedId": "5c53"}}), encoding="utf-8")
+    state.write_text(
+        json.dumps({"trust": {"demo": -5}, "soulMap": {"5c53": ["intro_001"]}}),
+        encoding="utf-8",
+    )
+    db = tmp_path / "soulseed.db"
+    counts = sqlite_store.migrate(db, profiles=profiles, state=state)
+    assert counts == {"profiles": 1, "trust": 1, "soulMap": 1}
+
+    store = sqlite_store.SqliteStateStore(db)
+    assert store.get("trust", "demo") == -5
+    assert store.get("soulMap", "5c53") == ["intro_001"]
+    assert store.get("profiles", "aim") == {"soulSeedId": "5c53"}
+
+
+def test_wal_refuses_a_second_owner(tmp_path):
+    first = WalStateStore(tmp_path / "state.json")
+    with pytest.raises(RuntimeError):
+        WalStateStore(tmp_path / "state.json")
+    first.close()
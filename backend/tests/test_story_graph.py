@@ -0,0 +1,61 @@
+import json
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+GRAPH_PATH = ROOT / "backend" / "story_graph.py"
+
+spec = importlib.util.spec_from_file_location("story_graph", GRAPH_PATH)
+story_graph = importlib.util.module_from_spec(spec)
+sys.modules.setdefault("story_graph", story_graph)
+spec.loader.exec_module(story_graph)
+StoryGraph = story_graph.StoryGraph
+
+
+def _write(path: Path, data: dict, mtime_ns: int) -> None:
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_renders_once(tmp_path):
+    path = tmp_path / "story.json"
+    _write(path, {"a": {"text": "A", "choices": {"1": "go_on"}}}, 10**18)
+    graph = StoryGraph(path)
+    first = graph["a"].response
+    assert first == {
+        "sceneTag": "a",
+        "text": "A",
+        "choices": [{"tag": "1", "label": "Go On"}],
+    }
+    assert graph["a"].response is first
+
+
+def test_reloads_on_change(tmp_path):
+    path = tmp_path / "story.json"
+    _write(path, {"a": {"text": "A"}}, 10**18)
+    graph = StoryGraph(path)
+    before = graph["a"]
+
+    # same bytes, new mtime: records are kept
+    _write(path, {"a": {"text": "A"}}, 2 * 10**18)
+    assert graph["a"] is before
+
+    _write(path, {"a": {"text": "B"}}, 3 * 10**18)
+    assert graph["a"].text == "B"
+    assert "b" not in graph
+
+
+def test_broken_edit_keeps_last_good_graph(tmp_path):
+    path = tmp_path / "story.json"
+    _write(path, {"a": {"text": "A"}}, 10**18)
+    graph = StoryGraph(path)
+    digest = graph.digest
+
+    path.write_text('{"a": {"text": "B"', encoding="utf-8")
+    os.utime(path, ns=(2 * 10**18, 2 * 10**18))
+    assert graph["a"].text == "A" and graph.digest == digest
+
+    _write(path, {"a": {"text": "B"}}, 3 * 10**18)
+    assert graph["a"].text == "B"
@@ -0,0 +1,94 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+
+def _upload(client, player, body, name="ref.png"):
+    return client.post(
+        "/avatar/upload",
+        data={"playerId": player},
+        files={"file": (name, body, "image/png")},
+    )
+
+
+def test_identical_uploads_share_one_blob(import_main):
+    main = import_main()
+    client = TestClient(main.app)
+
+    a = _upload(client, "alice", b"same-bytes")
+    b = _upload(client, "bob", b"same-bytes")
+    assert a.status_code == b.status_code == 200
+    assert a.json()["sha256"] == b.json()["sha256"]
+
+    alice = main.UPLOADS_DIR / "alice" / "orig_001.png"
+    bob = main.UPLOADS_DIR / "bob" / "orig_001.png"
+    assert alice.read_bytes() == bob.read_bytes() == b"same-bytes"
+    assert alice.stat().st_ino == bob.stat().st_ino
+    assert len(list((main.BLOBS_DIR).glob("??/*"))) == 1
+
+
+def test_oversized_upload_is_rejected(import_main):
+    main = import_main(max_bytes=8)
+    client = TestClient(main.app)
+
+    resp = _upload(client, "carol", b"x" * 9)
+    assert resp.status_code == 413
+    assert not (main.UPLOADS_DIR / "carol").exists()
+    assert list((main.BLOBS_DIR / "tmp").iterdir()) == []
+
+
+def test_blobs_are_not_under_the_static_root(load_main):
+    module = load_main()
+    assert not module.BLOBS_DIR.resolve().is_relative_to(module.UPLOADS_DIR.resolve())
+
+
+def test_oversized_body_is_refused_before_parsing(import_main, monkeypatch):
+    main = import_main(max_bytes=8)
+    parsed = []
+    real = main.UploadFile.read
+
+    async def spy(self, *args):
+        parsed.append(True)
+        return await real(self, *args)
+
+    monkeypatch.setattr(main.UploadFile, "read", spy)
+    client = TestClient(main.app)
+    resp = _upload(client, "dave", b"x" * (main.FORM_OVERHEAD + 64))
+    assert resp.status_code == 413
+    assert parsed == []
+
+
+def test_failed_commit_removes_the_temp_file(import_main, monkeypatch):
+    main = import_main()
+
+    def broken(self, *args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(main.os, "replace", broken)
+    client = TestClient(main.app, raise_server_exceptions=False)
+    assert _upload(client, "erin", b"bytes").status_code == 500
+    assert list((main.BLOBS_DIR / "tmp").iterdir()) == []
+
+
+def test_chunked_body_is_cut_off_at_the_limit(import_main):
+    main = import_main(max_bytes=8)
+    head = b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+    chunks = [head] + [b"x" * main.FORM_OVERHEAD] * 4
+    sent = []
+
+    async def receive():
+        body = chunks.pop(0)
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/avatar/upload", "raw_path": b"/avatar/upload",
+        "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+        "server": ("test", 80), "client": ("test", 1), "app": main.app,
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+    }
+    asyncio.run(main.app(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert len(chunks) == 3                     # stopped reading once over the limit
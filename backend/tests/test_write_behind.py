@@ -0,0 +1,72 @@
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))       # same lookup as backend/main.py
+
+from write_behind import DROPPED, WriteBehindQueue  # noqa: E402
+
+
+class Sink:
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, rows):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("db down")
+        self.batches.append(list(rows))
+
+
+def test_rows_are_batched_and_flushed_on_close():
+    sink = Sink(delay=0.01)
+    queue = WriteBehindQueue("t", sink, max_batch=4)
+
+    async def run():
+        for i in range(10):
+            await queue.put(i)
+        await queue.close()
+
+    asyncio.run(run())
+    assert [r for b in sink.batches for r in b] == list(range(10))
+    assert all(len(b) <= 4 for b in sink.batches)
+    assert len(sink.batches) < 10
+
+
+def test_full_queue_applies_backpressure():
+    sink = Sink(delay=0.05)
+    queue = WriteBehindQueue("t", sink, maxsize=2, max_batch=1)
+
+    async def run():
+        await queue.put(0)
+        await asyncio.sleep(0)                  # drain task takes row 0
+        await queue.put(1)
+        await queue.put(2)
+        blocked = asyncio.ensure_future(queue.put(3))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        await blocked
+        await queue.close()
+
+    asyncio.run(run())
+    assert [b[0] for b in sink.batches] == [0, 1, 2, 3]
+
+
+def test_sink_failure_drops_batch_and_keeps_draining():
+    sink = Sink(fail=True)
+    queue = WriteBehindQueue("failing", sink)
+    before = DROPPED.value(queue="failing")
+
+    async def run():
+        await queue.put("a")
+        await queue.close()
+        sink.fail = False
+        await queue.put("b")
+        await queue.close()
+
+    asyncio.run(run())
+    assert DROPPED.value(queue="failing") == before + 1
+    assert sink.batches == [["b"]]
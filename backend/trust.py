@@ -7,18 +7,34 @@ import json
 from pathlib import Path
 
 
+SQLITE_SUFFIXES = {".db", ".sqlite", ".sqlite3"}
+
+
 class TrustManager:
-    """Manage a player's trust score persisted in a JSON file."""
+    """Manage a player's trust score persisted in a JSON file.
+
+    A ``path`` ending in ``.db``/``.sqlite`` stores the score as one row in the
+    SQLite ``kv`` table (namespace ``trust``) instead of rewriting a document.
+    All managers for the same database share one connection pool.
+    """
 
     def __init__(self, player_name: str, path: str = "backend/player_state.json"):
         self.player_name = player_name
         self.path = Path(path)
         self.trust: float = 0.0
+        self._kv = None
+        if self.path.suffix in SQLITE_SUFFIXES:
+            from sqlite_store import shared_kv  # backend/ must be on sys.path
+
+            self._kv = shared_kv(self.path)
         self.load()
 
     # persistence -----------------------------------------------------
     def load(self) -> None:
         """Load trust value from ``self.path`` for ``self.player_name``."""
+        if self._kv is not None:
+            self.trust = float(self._kv.get("trust", self.player_name, 0))
+            return
         try:
             with self.path.open("r") as fh:
                 data = json.load(fh)
@@ -30,6 +46,9 @@ class TrustManager:
 
     def save(self) -> None:
         """Save current trust value to ``self.path``."""
+        if self._kv is not None:
+            self._kv.put_many("trust", {self.player_name: self.trust})
+            return
         try:
             with self.path.open("r") as fh:
                 data = json.load(fh)
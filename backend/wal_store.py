@@ -0,0 +1,227 @@
+"""Write-ahead-log engine for player state (``STATE_BACKEND=wal``).
+
+Every update appends one JSON line to ``player_state.wal``; a syncer thread
+fsyncs the log in small batches and wakes the waiting writers, so one fsync
+covers every record that arrived in the same window.  A compactor thread folds
+the log into ``player_state.json`` (same layout as ``JsonStateStore``) once it
+grows past ``compact_bytes``.  On startup the snapshot is loaded and the log
+tail is replayed.
+
+Records are absolute ``set``/``del`` operations, so replaying a record that is
+already contained in the snapshot is harmless.
+
+The state lives in one process's memory, so the engine takes an exclusive lock
+on ``<log>.lock`` for its lifetime and refuses to start in a second uvicorn
+worker; use the ``json``, ``sharded`` or ``sqlite`` engines with ``--workers``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+from coherence import FileLock, lock_path
+from state_store import DELETE, Mutator, StateStore, atomic_write_json, read_json
+
+
+class WalStateStore(StateStore):
+    """In-memory state backed by a snapshot plus an append-only log."""
+
+    def __init__(
+        self,
+        snapshot: Path,
+        log: Path | None = None,
+        *,
+        sync_interval: float = 0.005,
+        compact_bytes: int = 4 * 1024 * 1024,
+        sync_timeout: float = 30.0,
+        exclusive: bool = True,
+    ) -> None:
+        self.snapshot = Path(snapshot)
+        self.log = Path(log) if log else self.snapshot.with_suffix(".wal")
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+        self.sync_timeout = sync_timeout
+
+        self._owner = None
+        if exclusive:
+            self._owner = FileLock(lock_path(self.log)).exclusive(blocking=False)
+            try:
+                self._owner.__enter__()
+            except BlockingIOError:
+                raise RuntimeError(f"{self.log} is owned by another process") from None
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()      # serialises fsync vs. log rotation
+        self._compact_lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._appended = 0          # seq of the last record written
+        self._durable = 0           # seq of the last record fsynced
+        self._failed: BaseException | None = None   # set once a flush/fsync fails
+        self._closed = False
+
+        self._data: dict[str, dict[str, Any]] = self._recover()
+        if self._rotated().exists():            # crashed mid-compaction
+            atomic_write_json(self.snapshot, self._data, fsync=True)
+            self._rotated().unlink()
+        self._fh = open(self.log, "ab")
+        self._wake = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._sync_loop, name="wal-sync", daemon=True),
+            threading.Thread(target=self._compact_loop, name="wal-compact", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    # recovery --------------------------------------------------------
+    def _rotated(self) -> Path:
+        return self.log.with_name(self.log.name + ".old")
+
+    def _recover(self) -> dict[str, dict[str, Any]]:
+        data = read_json(self.snapshot, {})
+        if not isinstance(data, dict):
+            data = {}
+        for path in (self._rotated(), self.log):
+            if path.exists():
+                self._replay(path, data)
+        return data
+
+    @staticmethod
+    def _replay(path: Path, data: dict[str, dict[str, Any]]) -> None:
+        good = 0
+        with path.open("rb") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:          # torn tail after a crash
+                    break
+                node = data.setdefault(rec["s"], {})
+                if rec.get("op") == "del":
+                    node.pop(rec["k"], None)
+                else:
+                    node[rec["k"]] = rec["v"]
+                good += len(line)
+        if good != path.stat().st_size:     # drop the torn tail before appending
+            os.truncate(path, good)
+
+    # StateStore ------------------------------------------------------
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(section, {}).get(key, default)
+
+    def update_many(self, section: str, updates: Mapping[str, Mutator]) -> None:
+        ts = time.time()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("state store is closed")
+            self._raise_failed()
+            node = self._data.get(section, {})
+            changes, lines = [], []
+            for key, fn in updates.items():       # a raising mutator leaves no trace
+                new = fn(node.get(key))
+                if new is DELETE:
+                    rec = {"op": "del", "s": section, "k": key, "ts": ts}
+                else:
+                    rec = {"op": "set", "s": section, "k": key, "v": new, "ts": ts}
+                lines.append(json.dumps(rec, separators=(",", ":")))
+                changes.append((key, new))
+            if not lines:
+                return
+            self._fh.write(("\n".join(lines) + "\n").encode("utf-8"))
+            node = self._data.setdefault(section, {})
+            for key, new in changes:
+                if new is DELETE:
+                    node.pop(key, None)
+                else:
+                    node[key] = new
+            self._appended += 1
+            seq = self._appended
+            self._wake.set()
+            deadline = time.monotonic() + self.sync_timeout
+            while self._durable < seq and not self._closed:
+                self._raise_failed()
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise TimeoutError(f"{self.log}: not synced within {self.sync_timeout}s")
+                self._synced.wait(left)
+
+    def _raise_failed(self) -> None:
+        """Called under ``_lock``: a failed fsync may have lost records, stop accepting writes."""
+        if self._failed is not None:
+            raise RuntimeError(f"{self.log}: write-ahead log failed") from self._failed
+
+    # background work -------------------------------------------------
+    def _sync_once(self) -> None:
+        with self._sync_lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        with self._lock:
+            seq = self._appended
+            if seq == self._durable or self._fh.closed or self._failed is not None:
+                return
+            try:
+                self._fh.flush()
+                fd = self._fh.fileno()
+            except OSError as exc:
+                self._fail(exc)
+                return
+        try:
+            os.fsync(fd)
+        except OSError as exc:
+            with self._lock:
+                self._fail(exc)
+            return
+        with self._lock:
+            self._durable = max(self._durable, seq)
+            self._synced.notify_all()
+
+    def _fail(self, exc: BaseException) -> None:
+        """Called under ``_lock``: record the error and wake the writers so they raise it."""
+        self._failed = exc
+        self._synced.notify_all()
+
+    def _sync_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            time.sleep(self.sync_interval)      # let concurrent writers pile up
+            self._sync_once()
+
+    def _compact_loop(self) -> None:
+        while not self._closed:
+            time.sleep(max(self.sync_interval * 100, 0.5))
+            try:
+                if self.log.stat().st_size >= self.compact_bytes:
+                    self.compact()
+            except FileNotFoundError:
+                pass
+
+    def compact(self) -> None:
+        """Fold the log into the snapshot and start a fresh log."""
+        with self._compact_lock:
+            with self._sync_lock:
+                self._sync_locked()
+                with self._lock:
+                    self._fh.close()
+                    os.replace(self.log, self._rotated())
+                    self._fh = open(self.log, "ab")
+                    image = json.loads(json.dumps(self._data))
+            atomic_write_json(self.snapshot, image, fsync=True)
+            self._rotated().unlink(missing_ok=True)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.compact()
+        with self._lock:
+            self._closed = True
+            self._synced.notify_all()
+            self._fh.close()
+        self._wake.set()
+        if self._owner is not None:
+            self._owner.__exit__(None, None, None)
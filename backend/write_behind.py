@@ -0,0 +1,84 @@
+"""Write-behind queue that drains rows into a sink in batches.
+
+Producers ``await put(row)`` and return as soon as the row is queued; one
+drain task pulls whatever has accumulated (up to ``max_batch``) and hands it to
+``sink`` in a single call.  The queue is bounded, so when the sink falls behind
+``put`` waits instead of letting memory grow.  ``close()`` drains what is left.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Generic, Sequence, TypeVar
+
+from common.metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge("write_behind_queue_depth", "Rows waiting to be persisted.")
+BATCH_ROWS = REGISTRY.histogram(
+    "write_behind_batch_rows", "Rows per sink call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+DROPPED = REGISTRY.counter("write_behind_dropped_total", "Rows lost because the sink raised.")
+
+R = TypeVar("R")
+Sink = Callable[[Sequence[Any]], Awaitable[None]]
+
+
+class WriteBehindQueue(Generic[R]):
+    def __init__(
+        self, name: str, sink: Sink, *, maxsize: int = 10_000, max_batch: int = 256
+    ) -> None:
+        self.name = name
+        self._sink = sink
+        self.maxsize = maxsize
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._queue is None or self._task is None or self._task.done():
+            # bound to the running loop; recreated if a previous loop went away
+            self._queue = asyncio.Queue(self.maxsize)
+            self._task = asyncio.get_running_loop().create_task(self._drain(self._queue))
+        return self._queue
+
+    async def put(self, row: R) -> None:
+        queue = self._ensure_started()
+        await queue.put(row)                    # blocks only when the queue is full
+        QUEUE_DEPTH.set(queue.qsize(), queue=self.name)
+
+    async def _drain(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            await self._flush(batch)
+            for _ in batch:
+                queue.task_done()
+            QUEUE_DEPTH.set(queue.qsize(), queue=self.name)
+
+    async def _flush(self, batch: list[R]) -> None:
+        BATCH_ROWS.observe(len(batch), queue=self.name)
+        try:
+            await self._sink(batch)
+        except Exception:                       # noqa: BLE001 – keep draining
+            DROPPED.inc(len(batch), queue=self.name)
+            log.exception("%s: dropped %d rows", self.name, len(batch))
+
+    async def close(self) -> None:
+        """Persist everything queued so far and stop the drain task."""
+        queue, task = self._queue, self._task
+        self._queue = self._task = None
+        if queue is None or task is None:
+            return
+        if not task.done():
+            await queue.join()
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        QUEUE_DEPTH.set(0, queue=self.name)
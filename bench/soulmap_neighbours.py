@@ -0,0 +1,89 @@
+"""Latency and recall@k of the soul map neighbour index against brute force.
+
+Builds a ``NeighbourIndex`` over ``--players`` synthetic soul maps (clustered
+around archetypal profiles, clamped to the trait bounds), then times
+``query()`` for random players and compares the results with an exact scan.
+Also times incremental upserts, the per-delta cost.
+
+    python bench/soulmap_neighbours.py --players 1000000 --k 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from soulmap.model import LOWER, UPPER  # noqa: E402
+from soulmap.neighbours import _COLS, NeighbourIndex  # noqa: E402
+
+
+def _rows(n: int, rng: np.random.Generator) -> np.ndarray:
+    lo, hi = LOWER[_COLS], UPPER[_COLS]
+    centres = rng.uniform(lo, hi, (64, len(_COLS)))
+    picks = centres[rng.integers(len(centres), size=n)]
+    noise = 0.25 * (hi - lo) * rng.standard_normal((n, len(_COLS)))
+    return np.clip(picks + noise, lo, hi).astype(np.float32)
+
+
+def _pct(samples: list[float], q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    data = _rows(args.players, rng)
+    ids = [f"p{i}" for i in range(args.players)]
+
+    index = NeighbourIndex(min_train=args.players + 1)     # load first, train once
+    t0 = time.perf_counter()
+    index.add_rows(ids, data)
+    t1 = time.perf_counter()
+    index.train()
+    t2 = time.perf_counter()
+    print(f"players={args.players} dim={index.dim} lists={len(index._centres)}")
+    print(f"load {t1 - t0:.1f}s  train {t2 - t1:.1f}s")
+
+    picks = rng.choice(args.players, args.queries, replace=False)
+    exact = {}
+    for p in picks.tolist():
+        d = ((data - data[p]) ** 2).sum(axis=1)
+        d[p] = np.inf
+        exact[p] = {f"p{i}" for i in np.argpartition(d, args.k)[: args.k].tolist()}
+
+    for nprobe in args.nprobe:
+        lat, hits = [], 0
+        for p in picks.tolist():
+            t = time.perf_counter()
+            found = index.query(f"p{p}", args.k, nprobe=nprobe)
+            lat.append((time.perf_counter() - t) * 1000)
+            hits += len({pid for pid, _ in found} & exact[p])
+        print(
+            f"nprobe={nprobe:<3} p50={statistics.median(lat):.2f}ms "
+            f"p99={_pct(lat, 0.99):.2f}ms recall@{args.k}={hits / (args.k * len(picks)):.3f}"
+        )
+
+    moved = _rows(args.queries, rng)
+    lat = []
+    for p, row in zip(picks.tolist(), moved):
+        t = time.perf_counter()
+        index.add_rows([f"p{p}"], row[None, :])
+        lat.append((time.perf_counter() - t) * 1000)
+    print(f"upsert p50={statistics.median(lat):.3f}ms p99={_pct(lat, 0.99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
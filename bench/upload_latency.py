@@ -0,0 +1,99 @@
+"""p50/p99 latency of ``/trust`` and ``/choice`` while large uploads are in flight.
+
+Runs the backend app in-process over ``httpx.ASGITransport`` so every request
+shares one event loop – exactly the situation where a handler blocking on disk
+stalls everybody else.  Uploads go to a temporary directory.
+
+    python bench/upload_latency.py --uploads 8 --size-mb 32 --probes 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend import main  # noqa: E402
+
+
+def _pct(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _probe(client: httpx.AsyncClient, n: int) -> dict[str, list[float]]:
+    out: dict[str, list[float]] = {"/trust": [], "/choice": []}
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await client.get("/trust", params={"soulSeedId": "bench"})
+        out["/trust"].append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        await client.post(
+            "/choice",
+            json={"soulSeedId": "bench", "sceneTag": "intro_001", "choiceTag": "1"},
+        )
+        out["/choice"].append(time.perf_counter() - t0)
+    return out
+
+
+async def _upload_loop(client: httpx.AsyncClient, idx: int, blob: bytes, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        await client.post(
+            "/avatar/upload",
+            data={"playerId": f"bench{idx}"},
+            files={"file": ("ref.png", blob, "image/png")},
+        )
+
+
+async def run(uploads: int, size_mb: int, probes: int) -> None:
+    blob = b"\0" * (size_mb * 1024 * 1024)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as ac:
+        idle = await _probe(ac, probes)
+
+        stop = asyncio.Event()
+        loaders = [asyncio.create_task(_upload_loop(ac, i, blob, stop)) for i in range(uploads)]
+        await asyncio.sleep(0.1)
+        busy = await _probe(ac, probes)
+        stop.set()
+        await asyncio.gather(*loaders)
+
+    print(f"{'route':8} {'phase':6} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for phase, data in (("idle", idle), ("upload", busy)):
+        for route, samples in data.items():
+            print(
+                f"{route:8} {phase:6} {_pct(samples, .50) * 1e3:8.2f} "
+                f"{_pct(samples, .99) * 1e3:8.2f} {statistics.fmean(samples) * 1e3:8.2f}"
+            )
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=8, help="concurrent uploaders")
+    parser.add_argument("--size-mb", type=int, default=32, help="upload size")
+    parser.add_argument("--probes", type=int, default=300, help="requests per route")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.UPLOADS_DIR = Path(tmp) / "uploads"
+        main.BLOBS_DIR = Path(tmp) / "blobs"
+        main.blob_store = main.BlobStore(
+            main.BLOBS_DIR, max_bytes=(args.size_mb + 1) * 1024 * 1024
+        )
+        main.state_store = main.make_state_store(
+            "json", file=Path(tmp) / "state.json", directory=Path(tmp) / "shards"
+        )
+        asyncio.run(run(args.uploads, args.size_mb, args.probes))
+
+
+if __name__ == "__main__":
+    main_cli()
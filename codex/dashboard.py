@@ -4,9 +4,12 @@ from __future__ import annotations
 
 from fastapi import FastAPI
 
+from common.metrics import instrument
+
 from .orchestrator import Orchestrator
 
 app = FastAPI(title="Codex Orchestrator")
+instrument(app, "codex")
 orc = Orchestrator()
 
 
@@ -0,0 +1,242 @@
+"""Process-local request and dependency metrics in Prometheus text format.
+
+``instrument(app, "soulseed")`` adds an ASGI middleware that records a latency
+histogram per route template and an in-flight gauge, and mounts ``/metrics``.
+Time spent in dependencies is recorded with::
+
+    with track("postgres", "ritual_insert"):
+        ...
+
+Metrics are per process; scrape every worker (or run one per container).
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Sequence
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def expose(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str) -> None:
+        super().__init__(name, help)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def expose(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return super().expose() + [
+            f"{self.name}{_fmt_labels(k)} {_fmt_num(v)}" for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., sum, count]
+        self._values: dict[LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                row[idx] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, **labels: Any) -> int:
+        row = self._values.get(_key(labels))
+        return int(row[-1]) if row else 0
+
+    def expose(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = super().expose()
+        for key, row in items:
+            running = 0.0
+            for bound, n in zip(self.buckets, row):
+                running += n
+                lines.append(
+                    f"{self.name}_bucket{_fmt_labels(key, (('le', _fmt_num(bound)),))} "
+                    f"{_fmt_num(running)}"
+                )
+            inf = _fmt_labels(key, (("le", "+Inf"),))
+            lines.append(f"{self.name}_bucket{inf} {_fmt_num(row[-1])}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_num(row[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {_fmt_num(row[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, help: str, **kw: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kw)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric '{name}' already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(
+        self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.expose()) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template."
+)
+IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being served.")
+DEPENDENCY_LATENCY = REGISTRY.histogram(
+    "dependency_duration_seconds", "Time spent in file I/O, Postgres and OpenAI calls."
+)
+DEPENDENCY_ERRORS = REGISTRY.counter(
+    "dependency_errors_total", "Dependency calls that raised."
+)
+
+
+@contextmanager
+def track(kind: str, op: str) -> Iterator[None]:
+    """Time a dependency call; ``kind`` is ``file_io``, ``postgres`` or ``openai``."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS.inc(kind=kind, op=op)
+        raise
+    finally:
+        DEPENDENCY_LATENCY.observe(time.perf_counter() - start, kind=kind, op=op)
+
+
+# ───────────────────────────────── ASGI side ─────────────────────────────────
+class MetricsMiddleware:
+    """Pure ASGI middleware; labels by route template to bound cardinality."""
+
+    def __init__(self, app: Any, service: str) -> None:
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def _send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(service=self.service)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            IN_FLIGHT.dec(service=self.service)
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                service=self.service,
+                method=scope.get("method", ""),
+                route=getattr(route, "path", "<unmatched>"),
+                status=status["code"],
+            )
+
+
+def instrument(app: Any, service: str, *, path: str = "/metrics") -> None:
+    """Add the timing middleware and a Prometheus ``/metrics`` route to ``app``."""
+    from fastapi.responses import PlainTextResponse
+
+    app.add_middleware(MetricsMiddleware, service=service)
+
+    @app.get(path, include_in_schema=False)
+    def metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
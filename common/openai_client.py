@@ -0,0 +1,374 @@
+"""Resilience layer for OpenAI (or any remote) calls.
+
+Wrap each logical call in a :class:`ResilientClient`; the callable receives the
+per-attempt timeout in seconds and should pass it to the SDK::
+
+    scenes = ResilientClient("story.scene", Policy(deadline=20))
+    resp = scenes.call(lambda t: client.chat.completions.create(..., timeout=t))
+
+Every call gets
+
+* a **deadline** – the whole call, retries included, never takes longer;
+* **retries** with full-jitter exponential backoff, limited by a shared
+  :class:`RetryBudget` so an outage does not multiply upstream load;
+* a **hedge** – once an attempt is slower than the observed ``hedge_quantile``
+  latency, a duplicate is started.  Async callers take the first answer;
+  sync callers run the attempt in their own thread, so the hedge (on the
+  client's own small pool) answers when that attempt fails or times out,
+  without spending a retry;
+* a :class:`CircuitBreaker` – after repeated transient failures calls raise
+  :class:`CircuitOpen` immediately and callers use their local fallback.
+
+Create SDK clients with ``max_retries=0`` so retries are governed here only;
+the SDK honours ``OPENAI_BASE_URL``, which is how tests point it at a stub.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, TypeVar
+
+from common.metrics import REGISTRY
+
+T = TypeVar("T")
+
+ATTEMPTS = REGISTRY.counter(
+    "remote_call_attempts_total", "Remote call attempts by client and outcome."
+)
+HEDGES = REGISTRY.counter("remote_call_hedges_total", "Hedged duplicate attempts started.")
+BREAKER_OPEN = REGISTRY.gauge("remote_call_breaker_open", "1 while the circuit is open.")
+
+
+class CircuitOpen(RuntimeError):
+    """Raised without calling upstream while the breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's overall deadline passed before any attempt succeeded."""
+
+
+_TRANSIENT_STATUS = {408, 409, 429}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx are worth retrying."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:                             # pragma: no cover
+        openai = None  # type: ignore[assignment]
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return True                                 # includes APITimeoutError
+    status = getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status in _TRANSIENT_STATUS or status >= 500)
+
+
+@dataclass(frozen=True)
+class Policy:
+    deadline: float = 10.0                  # seconds for the whole call
+    attempt_timeout: float | None = None    # per attempt; None → remaining deadline
+    max_attempts: int = 3
+    backoff_base: float = 0.05
+    backoff_max: float = 1.0
+    hedge_quantile: float | None = 0.95     # None disables hedging
+    hedge_min_delay: float = 0.05
+    retryable: Callable[[BaseException], bool] = is_transient
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults: Any) -> "Policy":
+        """Read ``<PREFIX>_DEADLINE``, ``_MAX_ATTEMPTS`` and ``_HEDGE_QUANTILE``."""
+        env = os.environ
+        if f"{prefix}_DEADLINE" in env:
+            defaults["deadline"] = float(env[f"{prefix}_DEADLINE"])
+        if f"{prefix}_MAX_ATTEMPTS" in env:
+            defaults["max_attempts"] = int(env[f"{prefix}_MAX_ATTEMPTS"])
+        if f"{prefix}_HEDGE_QUANTILE" in env:
+            q = float(env[f"{prefix}_HEDGE_QUANTILE"])
+            defaults["hedge_quantile"] = q if 0 < q < 1 else None
+        return cls(**defaults)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class RetryBudget:
+    """Token bucket: each call earns ``ratio`` tokens, each retry or hedge spends one."""
+
+    def __init__(self, ratio: float = 0.2, *, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive transient failures for ``reset_after`` s.
+
+    When the cool-down ends one probe call is let through (half-open); its
+    outcome closes the circuit again or restarts the cool-down.
+    """
+
+    def __init__(self, name: str, *, threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """End a probe that finished without an outcome (cancelled, interrupted)."""
+        with self._lock:
+            self._probing = False
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+        BREAKER_OPEN.set(0, client=self.name)
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+        if self._opened_at is not None:
+            BREAKER_OPEN.set(1, client=self.name)
+
+
+class LatencyWindow:
+    """Recent successful latencies, used to pick the hedge delay."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+_SKIPPED = object()
+
+
+class ResilientClient:
+    def __init__(
+        self,
+        name: str,
+        policy: Policy | None = None,
+        *,
+        breaker: CircuitBreaker | None = None,
+        budget: RetryBudget | None = None,
+        max_hedges: int = 4,
+    ) -> None:
+        self.name = name
+        self.policy = policy or Policy()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.budget = budget or RetryBudget()
+        self.latency = LatencyWindow()
+        # sync hedges only; threads start on demand, at most ``max_hedges``
+        self._hedges = ThreadPoolExecutor(max_hedges, thread_name_prefix=f"hedge-{name}")
+
+    # shared bookkeeping ----------------------------------------------
+    def _hedge_delay(self) -> float | None:
+        q = self.policy.hedge_quantile
+        if q is None:
+            return None
+        observed = self.latency.quantile(q)
+        return None if observed is None else max(self.policy.hedge_min_delay, observed)
+
+    def _attempt_timeout(self, remaining: float) -> float:
+        per = self.policy.attempt_timeout
+        return remaining if per is None else min(per, remaining)
+
+    def _admit(self) -> bool:
+        """Let the call through or raise :class:`CircuitOpen`; ``True`` for a half-open probe."""
+        if not self.breaker.allow():
+            ATTEMPTS.inc(client=self.name, outcome="short_circuit")
+            raise CircuitOpen(f"{self.name}: circuit open")
+        self.budget.deposit()
+        return self.breaker.is_open
+
+    def _ok(self, started: float) -> None:
+        self.latency.add(time.monotonic() - started)
+        self.breaker.success()
+        ATTEMPTS.inc(client=self.name, outcome="ok")
+
+    def _failed(self, exc: BaseException) -> bool:
+        """Record a failed attempt; returns whether it may be retried."""
+        transient = self.policy.retryable(exc)
+        ATTEMPTS.inc(client=self.name, outcome="transient" if transient else "error")
+        if transient:
+            self.breaker.failure()
+        else:
+            self.breaker.success()              # upstream is up, the request was bad
+        return transient
+
+    # sync -------------------------------------------------------------
+    def call(self, fn: Callable[[float], T]) -> T:
+        """Run ``fn(timeout)`` under the policy; blocking callers."""
+        probe = self._admit()
+        try:
+            return self._call(fn)
+        except BaseException as exc:
+            if probe and not isinstance(exc, Exception):
+                self.breaker.release()          # interrupted probe: let the next call probe
+            raise
+
+    def _call(self, fn: Callable[[float], T]) -> T:
+        end = time.monotonic() + self.policy.deadline
+        last: BaseException | None = None
+        for attempt in range(self.policy.max_attempts):
+            if attempt and not self.budget.withdraw():
+                break
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            started = time.monotonic()
+            try:
+                result = self._hedged_sync(fn, self._attempt_timeout(remaining), end)
+            except Exception as exc:            # noqa: BLE001 – classified below
+                if not self._failed(exc):
+                    raise
+                last = exc
+                time.sleep(min(self.policy.backoff(attempt), max(0.0, end - time.monotonic())))
+                continue
+            self._ok(started)
+            return result
+        raise DeadlineExceeded(f"{self.name}: gave up") from last
+
+    def _hedged_sync(self, fn: Callable[[float], T], timeout: float, end: float) -> T:
+        """The attempt runs in the caller's thread; ``fn`` must honour ``timeout``."""
+        delay = self._hedge_delay()
+        if delay is None or delay >= timeout:
+            return fn(timeout)
+        settled = threading.Event()
+
+        def hedge() -> Any:
+            if settled.wait(delay) or not self.budget.withdraw():
+                return _SKIPPED
+            HEDGES.inc(client=self.name)
+            return fn(max(0.0, end - time.monotonic()))
+
+        backup: Future = self._hedges.submit(hedge)
+        try:
+            return fn(timeout)
+        except Exception as exc:                # noqa: BLE001 – fall back to the hedge
+            error = exc
+        finally:
+            settled.set()                       # a hedge that has not fired never will
+            backup.cancel()
+        try:
+            result = backup.result(timeout=max(0.0, end - time.monotonic()))
+        except BaseException:                   # noqa: BLE001 – cancelled, timed out or failed
+            raise error from None
+        if result is _SKIPPED:
+            raise error
+        return result
+
+    # async ------------------------------------------------------------
+    async def acall(self, fn: Callable[[float], Awaitable[T]]) -> T:
+        """Run ``await fn(timeout)`` under the policy."""
+        probe = self._admit()
+        try:
+            return await self._acall(fn)
+        except BaseException as exc:
+            if probe and not isinstance(exc, Exception):
+                self.breaker.release()          # cancelled probe: let the next call probe
+            raise
+
+    async def _acall(self, fn: Callable[[float], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        end = loop.time() + self.policy.deadline
+        last: BaseException | None = None
+        for attempt in range(self.policy.max_attempts):
+            if attempt and not self.budget.withdraw():
+                break
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            started = time.monotonic()
+            try:
+                result = await self._hedged_async(fn, self._attempt_timeout(remaining), end)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:            # noqa: BLE001 – classified below
+                if not self._failed(exc):
+                    raise
+                last = exc
+                await asyncio.sleep(min(self.policy.backoff(attempt), max(0.0, end - loop.time())))
+                continue
+            self._ok(started)
+            return result
+        raise DeadlineExceeded(f"{self.name}: gave up") from last
+
+    async def _hedged_async(
+        self, fn: Callable[[float], Awaitable[T]], timeout: float, end: float
+    ) -> T:
+        loop = asyncio.get_running_loop()
+
+        def start(t: float) -> asyncio.Task:
+            return asyncio.ensure_future(asyncio.wait_for(fn(t), t))
+
+        tasks = {start(timeout)}
+        try:
+            delay = self._hedge_delay()
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.budget.withdraw():
+                    HEDGES.inc(client=self.name)
+                    tasks.add(start(max(0.0, end - loop.time())))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
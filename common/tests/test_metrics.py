@@ -0,0 +1,43 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.metrics import Registry, instrument, track, DEPENDENCY_LATENCY, REQUEST_LATENCY
+
+
+def test_route_template_and_exposition():
+    app = FastAPI()
+    instrument(app, "unit")
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str) -> dict:
+        with track("file_io", "unit_read"):
+            return {"id": item_id}
+
+    client = TestClient(app)
+    before = REQUEST_LATENCY.count(
+        service="unit", method="GET", route="/items/{item_id}", status=200
+    )
+    client.get("/items/a")
+    client.get("/items/b")
+    assert REQUEST_LATENCY.count(
+        service="unit", method="GET", route="/items/{item_id}", status=200
+    ) == before + 2
+    assert DEPENDENCY_LATENCY.count(kind="file_io", op="unit_read") >= 2
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'route="/items/{item_id}"' in resp.text
+    assert "# TYPE http_requests_in_flight gauge" in resp.text
+
+
+def test_histogram_buckets_are_cumulative():
+    reg = Registry()
+    h = reg.histogram("t_seconds", "test", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v, op="x")
+    text = reg.expose()
+    assert 't_seconds_bucket{op="x",le="0.1"} 1' in text
+    assert 't_seconds_bucket{op="x",le="1"} 2' in text
+    assert 't_seconds_bucket{op="x",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="x"} 3' in text
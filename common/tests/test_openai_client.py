@@ -0,0 +1,190 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from common.openai_client import (
+    CircuitBreaker,
+    CircuitOpen,
+    DeadlineExceeded,
+    Policy,
+    ResilientClient,
+)
+
+EMBEDDING = {
+    "object": "list",
+    "model": "stub",
+    "data": [{"object": "embedding", "index": 0, "embedding": [0.25, 0.5]}],
+    "usage": {"prompt_tokens": 1, "total_tokens": 1},
+}
+
+
+class Stub:
+    """Tiny OpenAI-compatible server; each request pops a (delay, status)."""
+
+    def __init__(self):
+        self.plan = []
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                delay, status = stub.plan.pop(0) if stub.plan else (0.0, 200)
+                time.sleep(delay)
+                body = json.dumps(EMBEDDING if status == 200 else {"error": {"message": "x"}})
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body.encode())
+                except OSError:
+                    pass                        # client gave up (timeout / hedge loser)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stub():
+    s = Stub()
+    yield s
+    s.server.shutdown()
+
+
+def embed(client):
+    return lambda timeout: client.embeddings.create(model="m", input="x", timeout=timeout)
+
+
+def test_retries_transient_errors(stub):
+    stub.plan = [(0, 500), (0, 503)]
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    calls = ResilientClient("t.retry", Policy(deadline=5, backoff_base=0.001))
+    assert calls.call(embed(sdk)).data[0].embedding == [0.25, 0.5]
+    assert stub.requests == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.plan = [(0, 400)]
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    with pytest.raises(openai.BadRequestError):
+        ResilientClient("t.400").call(embed(sdk))
+    assert stub.requests == 1
+
+
+def test_deadline_bounds_the_whole_call(stub):
+    stub.plan = [(2.0, 200)] * 3
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    calls = ResilientClient("t.deadline", Policy(deadline=0.3, hedge_quantile=None))
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        calls.call(embed(sdk))
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_slow_attempt_is_hedged(stub):
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    calls = ResilientClient(
+        "t.hedge", Policy(deadline=5, attempt_timeout=0.4, hedge_min_delay=0.05)
+    )
+    for _ in range(20):
+        calls.latency.add(0.01)
+    stub.plan = [(2.0, 200), (0.0, 200)]
+    t0 = time.monotonic()
+    calls.call(embed(sdk))                      # the hedge answers when the attempt times out
+    assert time.monotonic() - t0 < 1.0
+    assert stub.requests == 2                   # no retry needed
+
+
+def test_hedge_is_dropped_when_the_attempt_wins(stub):
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    calls = ResilientClient("t.hedge_drop", Policy(deadline=5, hedge_min_delay=0.2))
+    for _ in range(20):
+        calls.latency.add(0.01)
+    calls.call(embed(sdk))
+    time.sleep(0.3)
+    assert stub.requests == 1
+
+
+def test_busy_client_does_not_starve_another(stub):
+    stub.plan = [(1.0, 200)] * 4
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    slow = ResilientClient("t.slow", Policy(deadline=5, hedge_quantile=None), max_hedges=1)
+    threads = [threading.Thread(target=slow.call, args=(embed(sdk),)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    fast = ResilientClient("t.fast", Policy(deadline=0.5))
+    assert fast.call(lambda timeout: "ok") == "ok"
+    for t in threads:
+        t.join()
+
+
+def test_breaker_fails_fast_then_probes(stub):
+    stub.plan = [(0, 503)] * 4
+    sdk = openai.OpenAI(api_key="k", base_url=stub.url, max_retries=0)
+    breaker = CircuitBreaker("t.breaker", threshold=2, reset_after=0.2)
+    calls = ResilientClient(
+        "t.breaker", Policy(max_attempts=2, backoff_base=0.001), breaker=breaker
+    )
+    with pytest.raises(DeadlineExceeded):
+        calls.call(embed(sdk))
+    assert breaker.is_open
+    seen = stub.requests
+    with pytest.raises(CircuitOpen):
+        calls.call(embed(sdk))
+    assert stub.requests == seen
+
+    time.sleep(0.25)
+    stub.plan = []
+    calls.call(embed(sdk))                      # half-open probe succeeds
+    assert not breaker.is_open
+
+
+def test_async_retry_and_hedge(stub):
+    stub.plan = [(0, 502), (2.0, 200), (0.0, 200)]
+    calls = ResilientClient("t.async", Policy(deadline=5, backoff_base=0.001))
+    for _ in range(20):
+        calls.latency.add(0.01)
+
+    async def run():
+        sdk = openai.AsyncOpenAI(api_key="k", base_url=stub.url, max_retries=0)
+        res = await calls.acall(
+            lambda timeout: sdk.embeddings.create(model="m", input="x", timeout=timeout)
+        )
+        await sdk.close()
+        return res
+
+    t0 = time.monotonic()
+    assert asyncio.run(run()).data[0].embedding == [0.25, 0.5]
+    assert time.monotonic() - t0 < 1.0
+    assert stub.requests == 3
+
+
+def test_cancelled_half_open_probe_releases_the_breaker():
+    breaker = CircuitBreaker("t.cancel", threshold=1, reset_after=0.05)
+    calls = ResilientClient("t.cancel", Policy(deadline=5), breaker=breaker)
+    breaker.failure()
+    time.sleep(0.06)
+
+    async def run():
+        probe = asyncio.ensure_future(calls.acall(lambda timeout: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await calls.acall(lambda timeout: asyncio.sleep(0, "ok"))
+
+    assert asyncio.run(run()) == "ok"
+    assert not breaker.is_open
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+import pytest
+
+from common import vecpack
+
+
+def test_f16_and_i8_round_trip_compactly():
+    rng = np.random.default_rng(0)
+    vec = rng.standard_normal(768).astype(np.float32)
+    text = json.dumps(vec.tolist())
+
+    f16 = vecpack.pack(vec, "f16")
+    assert np.allclose(vecpack.to_array(f16), vec, atol=1e-2)
+    i8 = vecpack.pack(vec, "i8")
+    back = vecpack.to_array(i8)
+    assert np.abs(back - vec).max() <= i8["scale"] / 2 + 1e-6
+    cos = back @ vec / (np.linalg.norm(back) * np.linalg.norm(vec))
+    assert cos > 0.999
+
+    assert len(json.dumps(i8)) * 10 < len(text)
+    assert len(json.dumps(f16)) * 5 < len(text)
+
+
+def test_unpack_accepts_lists_and_rejects_bad_input():
+    assert vecpack.unpack([0.1, 0.2]) == [0.1, 0.2]
+    assert vecpack.unpack(vecpack.pack([0.0] * 4, "i8")) == [0.0] * 4
+    assert vecpack.as_format([1.0, -1.0], "list") == [1.0, -1.0]
+    with pytest.raises(ValueError):
+        vecpack.pack([1.0], "f64")
+    bad = dict(vecpack.pack([1.0, 2.0]), dim=3)
+    with pytest.raises(ValueError):
+        vecpack.to_array(bad)
@@ -0,0 +1,79 @@
+"""Compact encodings for embedding vectors.
+
+A 768-dim vector written as a JSON float list costs 10–15 KB of text and a
+full JSON parse.  ``pack`` turns it into a small JSON object instead::
+
+    {"enc": "f16", "dim": 768, "b64": "..."}                 # 1.5 KB binary
+    {"enc": "i8",  "dim": 768, "scale": 0.0078, "b64": "..."}  # 768 B binary
+
+``f16`` keeps ~3 significant digits; ``i8`` stores ``round(x / scale)`` with
+``scale = max|x| / 127``, which is plenty for cosine similarity.  ``unpack``
+accepts either form as well as a plain list, so stored data can be migrated
+lazily.
+"""
+
+from __future__ import annotations
+
+import base64
+from typing import Any, Dict, List, Literal, Sequence, Union
+
+import numpy as np
+
+VecFormat = Literal["list", "f16", "i8"]
+FORMATS: tuple[str, ...] = ("list", "f16", "i8")
+
+Packed = Dict[str, Any]
+VectorLike = Union[Sequence[float], np.ndarray, Packed]
+
+
+def is_packed(obj: Any) -> bool:
+    return isinstance(obj, dict) and obj.get("enc") in ("f16", "i8") and "b64" in obj
+
+
+def pack(vec: Sequence[float] | np.ndarray, enc: str = "f16") -> Packed:
+    arr = np.asarray(vec, dtype=np.float32).ravel()
+    if enc == "f16":
+        raw = arr.astype("<f2").tobytes()
+        return {"enc": "f16", "dim": int(arr.size), "b64": base64.b64encode(raw).decode("ascii")}
+    if enc == "i8":
+        peak = float(np.abs(arr).max()) if arr.size else 0.0
+        scale = peak / 127 if peak else 0.0
+        q = np.zeros(arr.size, np.int8) if not scale else np.clip(
+            np.rint(arr / scale), -127, 127
+        ).astype(np.int8)
+        return {
+            "enc": "i8",
+            "dim": int(arr.size),
+            "scale": scale,
+            "b64": base64.b64encode(q.tobytes()).decode("ascii"),
+        }
+    raise ValueError(f"unknown vector encoding '{enc}'")
+
+
+def to_array(obj: VectorLike) -> np.ndarray:
+    """Decode any supported form to a float32 array."""
+    if not is_packed(obj):
+        return np.asarray(obj, dtype=np.float32)
+    raw = base64.b64decode(obj["b64"])
+    if obj["enc"] == "f16":
+        arr = np.frombuffer(raw, dtype="<f2").astype(np.float32)
+    else:
+        arr = np.frombuffer(raw, dtype=np.int8).astype(np.float32) * np.float32(obj["scale"])
+    if arr.size != obj.get("dim", arr.size):
+        raise ValueError(f"packed vector has {arr.size} values, expected {obj['dim']}")
+    return arr
+
+
+def unpack(obj: VectorLike) -> List[float]:
+    if isinstance(obj, (list, tuple)):
+        return [float(v) for v in obj]          # keep full precision of plain lists
+    return to_array(obj).tolist()
+
+
+def as_format(obj: VectorLike, fmt: str) -> List[float] | Packed:
+    """Render a vector for a response: a plain list or a packed object."""
+    if fmt == "list":
+        return unpack(obj)
+    if is_packed(obj) and obj["enc"] == fmt:
+        return obj
+    return pack(to_array(obj), fmt)
@@ -1,17 +1,28 @@
 import os, openai
 
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from common.metrics import track
+from common.openai_client import Policy, ResilientClient
+
+client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+# code generation is slow and expensive: generous deadline, no hedged duplicates
+_codex_calls = ResilientClient(
+    "codex", Policy.from_env("CODEX_OPENAI", deadline=120.0, hedge_quantile=None)
+)
 
 def call_codex(prompt, filename, model="gpt-4o-mini"):
     """Simple wrapper that returns the generated code string."""
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are Codex, generate code only."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1,
-    )
+    with track("openai", "codex"):
+        response = _codex_calls.call(
+            lambda timeout: client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "You are Codex, generate code only."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                timeout=timeout,
+            )
+        )
     code = response.choices[0].message.content
     with open(filename, "w") as f:
         f.write(code.strip() + "\n")
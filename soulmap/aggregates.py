@@ -0,0 +1,155 @@
+"""Population statistics over all stored soul maps, maintained incrementally.
+
+For every trait of the fixed layout (virtues, shadows, motivations,
+archetypes, dynamic stats) ``PopulationStats`` keeps the running sums
+``Σx`` and ``Σx²`` and a fixed-bucket histogram over the trait's clamp
+range.  A delta replaces one player's old trait row with the new one, so an
+update is O(traits) and reading mean/variance/histograms never depends on the
+number of players.
+
+Recompute from the file, and compare with a running service's values::
+
+    python -m soulmap.aggregates rebuild --data soulmap/soul_map.json
+    python -m soulmap.aggregates rebuild --live http://localhost:8001
+
+In-process, :meth:`PopulationStats.check` (``GET /v1/soulmap/stats/check``)
+reports the largest difference between the running values and a recompute.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from soulmap.model import LOWER, N_TRAITS, SECTIONS, SLICES, UPPER, SoulMap
+
+
+class PopulationStats:
+    """Running population moments and histograms.
+
+    ``source`` yields every stored player's trait row; it seeds the stats on
+    the first :meth:`ensure` so a restarted service starts from the real
+    population.  Call ``ensure()`` before the first ``replace()``.
+    """
+
+    def __init__(
+        self, bins: int = 20, *, source: Callable[[], Iterable[np.ndarray]] | None = None
+    ) -> None:
+        self.bins = bins
+        self._source = source
+        self._ready = False
+        self._lock = threading.Lock()
+        self.count = 0
+        self._s1 = np.zeros(N_TRAITS)
+        self._s2 = np.zeros(N_TRAITS)
+        self._hist = np.zeros((N_TRAITS, bins), dtype=np.int64)
+        self._cols = np.arange(N_TRAITS)
+
+    # ── updates ──────────────────────────────────────────────────────
+    def _buckets(self, rows: np.ndarray) -> np.ndarray:
+        pos = (rows - LOWER) / (UPPER - LOWER) * self.bins
+        return np.clip(pos.astype(np.intp), 0, self.bins - 1)
+
+    def _add(self, rows: np.ndarray, sign: int) -> None:
+        rows = np.atleast_2d(rows)
+        if not rows.size:
+            return
+        self.count += sign * len(rows)
+        self._s1 += sign * rows.sum(axis=0)
+        self._s2 += sign * (rows * rows).sum(axis=0)
+        cols = np.broadcast_to(self._cols, rows.shape)
+        np.add.at(self._hist, (cols, self._buckets(rows)), sign)
+
+    def replace(self, old: Optional[np.ndarray], new: np.ndarray) -> None:
+        """Swap players' previous trait rows (``None`` for new players) for ``new``."""
+        with self._lock:
+            if old is not None:
+                self._add(old, -1)
+            self._add(new, +1)
+
+    def rebuild(self, rows: Iterable[np.ndarray]) -> None:
+        matrix = np.array(list(rows), dtype=float).reshape(-1, N_TRAITS)
+        with self._lock:
+            self.count = 0
+            self._s1[:] = 0
+            self._s2[:] = 0
+            self._hist[:] = 0
+            self._add(matrix, +1)
+            self._ready = True
+
+    def ensure(self) -> None:
+        if not self._ready:
+            self.rebuild(self._source() if self._source else ())
+
+    def check(self, rows: Iterable[np.ndarray]) -> Dict[str, float]:
+        """:func:`drift` of the running values from a recompute over ``rows``."""
+        fresh = PopulationStats(self.bins)
+        fresh.rebuild(rows)
+        return drift(self.snapshot(), fresh.snapshot())
+
+    # ── reads ────────────────────────────────────────────────────────
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n, s1, s2, hist = self.count, self._s1.copy(), self._s2.copy(), self._hist.copy()
+        mean = s1 / n if n else np.zeros(N_TRAITS)
+        var = np.maximum(s2 / n - mean * mean, 0.0) if n else np.zeros(N_TRAITS)
+        sections: Dict[str, Any] = {}
+        for name, (fields, lo, hi, _) in SECTIONS.items():
+            edges = np.linspace(lo, hi, self.bins + 1).round(6).tolist()
+            sl = SLICES[name]
+            sections[name] = {
+                "edges": edges,
+                "fields": {
+                    f: {"mean": m, "var": v, "counts": c}
+                    for f, m, v, c in zip(
+                        fields, mean[sl].tolist(), var[sl].tolist(), hist[sl].tolist()
+                    )
+                },
+            }
+        return {"players": n, "sections": sections}
+
+
+def drift(live: Dict[str, Any], expected: Dict[str, Any]) -> Dict[str, float]:
+    """Largest absolute difference between two :meth:`~PopulationStats.snapshot` results."""
+    out = {"players": float(abs(live["players"] - expected["players"]))}
+    out.update(mean=0.0, var=0.0, counts=0.0)
+    for name, section in expected["sections"].items():
+        for field, want in section["fields"].items():
+            got = live["sections"][name]["fields"][field]
+            out["mean"] = max(out["mean"], abs(got["mean"] - want["mean"]))
+            out["var"] = max(out["var"], abs(got["var"] - want["var"]))
+            out["counts"] = max(
+                out["counts"], *(abs(a - b) for a, b in zip(got["counts"], want["counts"]))
+            )
+    return out
+
+
+def _cli() -> None:
+    here = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Soul map population statistics")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rb = sub.add_parser("rebuild", help="recompute stats from the soul map file")
+    rb.add_argument("--data", type=Path, default=here / "soul_map.json")
+    rb.add_argument("--bins", type=int, default=20)
+    rb.add_argument("--live", metavar="URL", help="print the drift of this service's stats")
+    args = parser.parse_args()
+
+    data = json.loads(args.data.read_text(encoding="utf-8") or "{}")
+    stats = PopulationStats(args.bins)
+    stats.rebuild(SoulMap.from_json(raw).traits for raw in data.values())
+    if args.live:
+        with urllib.request.urlopen(args.live.rstrip("/") + "/v1/soulmap/stats") as resp:
+            live = json.load(resp)
+        print(json.dumps(drift(live, stats.snapshot()), indent=2))
+    else:
+        print(json.dumps(stats.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,116 @@
+"""Choice-delta catalog compiled into a dense delta matrix.
+
+The catalog is a JSON object ``{choiceId: delta}`` where ``delta`` has the
+nested shape ``{"coreVirtues": {"courage": 0.1}, "npcTrust": {...}}``.  It is
+compiled into
+
+* ``matrix`` – one ``(N_TRAITS,)`` row per choice, so a lookup is a row
+  gather and a batch of choices is ``matrix[rows]``;
+* sparse side tables for ``npcTrust`` and ``intentVec`` (rare, open-ended).
+
+The file is re-checked at most every ``check_interval`` seconds and
+recompiled when its ``(mtime, size)`` changes.  A catalog that fails to
+compile is logged and ignored; the previous one stays live.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+from common.metrics import REGISTRY, track
+from soulmap.model import N_TRAITS, Delta
+
+log = logging.getLogger(__name__)
+
+CATALOG_SIZE = REGISTRY.gauge("soulmap_catalog_choices", "Choices in the live delta catalog.")
+CATALOG_RELOADS = REGISTRY.counter(
+    "soulmap_catalog_reloads_total", "Catalog reload attempts by outcome."
+)
+
+
+@dataclass(frozen=True)
+class CompiledCatalog:
+    ids: Dict[str, int]
+    matrix: np.ndarray                  # (choices, N_TRAITS)
+    deltas: Dict[str, Delta]            # per choice, ``traits`` is a view into ``matrix``
+
+    @classmethod
+    def compile(cls, raw: Mapping[str, Mapping[str, Any]]) -> "CompiledCatalog":
+        ids = {cid: n for n, cid in enumerate(raw)}
+        matrix = np.zeros((len(ids), N_TRAITS))
+        deltas: Dict[str, Delta] = {}
+        for cid, n in ids.items():
+            try:
+                d = Delta.compile(raw[cid])
+            except (KeyError, ValueError, TypeError, AttributeError) as exc:
+                raise ValueError(f"choice '{cid}': invalid delta ({exc!r})") from exc
+            matrix[n] = d.traits
+            deltas[cid] = Delta(matrix[n], d.npc_trust, d.intent)
+        matrix.flags.writeable = False
+        return cls(ids, matrix, deltas)
+
+
+class DeltaCatalog:
+    def __init__(self, path: Path, *, check_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version: tuple[int, int] | None = None
+        self._checked = 0.0
+        self._compiled = CompiledCatalog.compile({})
+        self.refresh(force=True)
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self, *, force: bool = False) -> CompiledCatalog:
+        """Recompile if the file changed; returns the live catalog."""
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return self._compiled
+        with self._lock:
+            self._checked = now
+            version = self._stat()
+            if version == self._version and not force:
+                return self._compiled
+            try:
+                with track("file_io", "soulmap_catalog_load"):
+                    raw = json.loads(self.path.read_text(encoding="utf-8"))
+                if not isinstance(raw, dict):
+                    raise ValueError("catalog must be a JSON object")
+                compiled = CompiledCatalog.compile(raw)
+            except FileNotFoundError:
+                log.warning("choice catalog %s not found", self.path)
+                compiled = self._compiled
+            except ValueError as exc:               # includes JSONDecodeError
+                CATALOG_RELOADS.inc(outcome="error")
+                log.error("keeping previous choice catalog: %s", exc)
+                self._version = version             # don't retry until it changes again
+                return self._compiled
+            self._version = version
+            self._compiled = compiled
+            CATALOG_RELOADS.inc(outcome="ok")
+            CATALOG_SIZE.set(len(compiled.ids))
+            return compiled
+
+    def get(self, choice_id: str) -> Delta | None:
+        return self.refresh().deltas.get(choice_id)
+
+    def __contains__(self, choice_id: str) -> bool:
+        return choice_id in self.refresh().ids
+
+    def __len__(self) -> int:
+        return len(self.refresh().ids)
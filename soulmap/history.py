@@ -0,0 +1,363 @@
+"""Append-only soul map history: an event log plus periodic snapshots.
+
+Every applied delta is appended to ``events.jsonl`` as one compact record::
+
+    {"q": 17, "t": 1760000000.25, "p": "hero", "c": "battle", "d": {"coreVirtues.courage": 0.1}}
+
+(``n`` carries npcTrust deltas and ``i`` a packed intentVec delta, when
+present).  After ``snapshot_every`` events for a player, the player's full
+state is appended to ``snapshots.jsonl``.  A player that already had a stored
+soul map before its first logged event gets a baseline snapshot of that state
+first, so replay never starts from the default for them.  A player's soul map
+at any moment is its latest snapshot at or before that moment plus the events
+after it, so history reads never touch the live store.
+
+Both files are indexed per player in memory on first use; a torn last line
+(crash mid-append) is truncated.  Only the last ``keep_snapshots`` snapshots
+of a player and the events after the oldest of them are kept (0 keeps
+everything), so earlier moments read as "no history".  Dropped records are
+removed from the files once ``compact_after`` of them have piled up.
+
+Rebuild ``soul_map.json`` from history::
+
+    python -m soulmap.history rebuild --dir soulmap/history --out soulmap/soul_map.json
+
+Rebuilding merges into ``--out``: players without history keep their entry.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common import vecpack
+from common.metrics import track
+from soulmap.model import INDEX, N_TRAITS, Delta, SoulMap
+
+NAMES = [f"{section}.{name}" for (section, name) in INDEX]
+_BY_NAME = {name: i for i, name in enumerate(NAMES)}
+
+Entry = Tuple[float, int, int]          # (timestamp, seq, byte offset)
+
+
+def encode_delta(delta: Delta) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {
+        "d": {NAMES[i]: float(delta.traits[i]) for i in np.flatnonzero(delta.traits)}
+    }
+    if delta.npc_trust:
+        rec["n"] = dict(delta.npc_trust)
+    if delta.intent is not None:
+        rec["i"] = vecpack.pack(delta.intent, "f16")
+    return rec
+
+
+def decode_delta(rec: Mapping[str, Any]) -> Delta:
+    traits = np.zeros(N_TRAITS)
+    for name, dv in rec.get("d", {}).items():
+        idx = _BY_NAME.get(name)
+        if idx is not None:                         # field retired from the layout
+            traits[idx] = dv
+    intent = vecpack.to_array(rec["i"]) if "i" in rec else None
+    return Delta(traits, rec.get("n", {}), intent)
+
+
+def _scan(path: Path) -> List[Tuple[int, Dict[str, Any]]]:
+    """Read ``(offset, record)`` pairs, truncating a torn or corrupt tail."""
+    out: List[Tuple[int, Dict[str, Any]]] = []
+    good = 0
+    try:
+        with open(path, "rb") as fh:
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    out.append((good, json.loads(line)))
+                except ValueError:
+                    break
+                good += len(line)
+    except FileNotFoundError:
+        return out
+    if good != path.stat().st_size:
+        with open(path, "r+b") as fh:
+            fh.truncate(good)
+    return out
+
+
+class SoulMapHistory:
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        snapshot_every: int = 50,
+        keep_snapshots: int = 20,
+        compact_after: int = 100_000,
+        fsync: bool = False,
+    ) -> None:
+        self.directory = Path(directory)
+        self.events_path = self.directory / "events.jsonl"
+        self.snapshots_path = self.directory / "snapshots.jsonl"
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = keep_snapshots
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._seq = 0
+        self._events: Dict[str, List[Entry]] = {}
+        self._snapshots: Dict[str, List[Entry]] = {}
+        self._since: Dict[str, int] = {}            # events since last snapshot
+        self._truncated: set[str] = set()           # players whose oldest records were dropped
+        self._dropped = 0                           # records dropped but still in the files
+        self._files: Dict[str, IO[bytes]] = {}
+
+    # ── index ────────────────────────────────────────────────────────
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with track("file_io", "soulmap_history_load"):
+                for off, rec in _scan(self.events_path):
+                    self._events.setdefault(rec["p"], []).append((rec["t"], rec["q"], off))
+                    self._since[rec["p"]] = self._since.get(rec["p"], 0) + 1
+                    self._seq = max(self._seq, rec["q"])
+                for off, rec in _scan(self.snapshots_path):
+                    self._snapshots.setdefault(rec["p"], []).append((rec["t"], rec["q"], off))
+            for pid, snaps in self._snapshots.items():
+                last = snaps[-1][1]
+                self._since[pid] = sum(1 for _, q, _ in self._events.get(pid, ()) if q > last)
+                self._prune(pid)
+            self._files = {
+                "events": open(self.events_path, "ab"),
+                "snapshots": open(self.snapshots_path, "ab"),
+            }
+            self._loaded = True
+
+    def _append(self, kind: str, records: Sequence[Dict[str, Any]]) -> List[int]:
+        fh = self._files[kind]
+        offsets = []
+        chunks = []
+        pos = fh.tell()
+        for rec in records:
+            line = (json.dumps(rec, separators=(",", ":")) + "\n").encode("utf-8")
+            offsets.append(pos)
+            chunks.append(line)
+            pos += len(line)
+        fh.write(b"".join(chunks))
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+        return offsets
+
+    def _prune(self, player_id: str) -> None:
+        """Drop index entries older than the player's oldest kept snapshot."""
+        snaps = self._snapshots[player_id]
+        if not self.keep_snapshots or len(snaps) <= self.keep_snapshots:
+            return
+        floor = snaps[-self.keep_snapshots][1]
+        events = self._events.get(player_id, [])
+        keep = [e for e in events if e[1] > floor]
+        self._dropped += len(snaps) - self.keep_snapshots + len(events) - len(keep)
+        self._snapshots[player_id] = snaps[-self.keep_snapshots:]
+        self._events[player_id] = keep
+        self._truncated.add(player_id)
+
+    def compact(self) -> int:
+        """Rewrite both files without the pruned records; returns how many were removed."""
+        self._load()
+        with self._lock, track("file_io", "soulmap_history_compact"):
+            for kind, path, index in (
+                ("events", self.events_path, self._events),
+                ("snapshots", self.snapshots_path, self._snapshots),
+            ):
+                live = sorted(
+                    (off, pid, n) for pid, entries in index.items()
+                    for n, (_, _, off) in enumerate(entries)
+                )
+                self._files[kind].close()
+                tmp = path.with_name(f".{path.name}.tmp")
+                with open(path, "rb") as src, open(tmp, "wb") as dst:
+                    for off, pid, n in live:
+                        src.seek(off)
+                        t, q, _ = index[pid][n]
+                        index[pid][n] = (t, q, dst.tell())
+                        dst.write(src.readline())
+                    dst.flush()
+                    if self.fsync:
+                        os.fsync(dst.fileno())
+                os.replace(tmp, path)
+                self._files[kind] = open(path, "ab")
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+    # ── writes ───────────────────────────────────────────────────────
+    def record(
+        self,
+        player_id: str,
+        choice_id: str,
+        delta: Delta,
+        soul: SoulMap,
+        *,
+        baseline: SoulMap | None = None,
+        ts: float | None = None,
+    ) -> None:
+        self.record_many(
+            [(player_id, choice_id, delta)],
+            {player_id: soul},
+            baseline={player_id: baseline} if baseline is not None else None,
+            ts=ts,
+        )
+
+    def record_many(
+        self,
+        ops: Iterable[Tuple[str, str, Delta]],
+        souls: Mapping[str, SoulMap],
+        *,
+        baseline: Mapping[str, SoulMap] | None = None,
+        ts: float | None = None,
+    ) -> None:
+        """Append events for ``ops`` (already applied) and any snapshots now due.
+
+        ``souls`` holds each player's state *after* all of its ops;
+        ``baseline`` the state *before* them, for players that were stored
+        but have no history yet.
+        """
+        self._load()
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            first = [
+                {"q": self._seq, "t": ts, "p": pid, "s": soul.to_json()}
+                for pid, soul in (baseline or {}).items()
+                if pid not in self
+            ]
+            if first:
+                with track("file_io", "soulmap_history_append"):
+                    for rec, off in zip(first, self._append("snapshots", first)):
+                        self._snapshots[rec["p"]] = [(ts, rec["q"], off)]
+                        self._since[rec["p"]] = 0
+            events = []
+            for pid, choice, delta in ops:
+                self._seq += 1
+                events.append(
+                    {"q": self._seq, "t": ts, "p": pid, "c": choice, **encode_delta(delta)}
+                )
+            if not events:
+                return
+            with track("file_io", "soulmap_history_append"):
+                for rec, off in zip(events, self._append("events", events)):
+                    self._events.setdefault(rec["p"], []).append((ts, rec["q"], off))
+                    self._since[rec["p"]] = self._since.get(rec["p"], 0) + 1
+                due = [
+                    {"q": self._events[pid][-1][1], "t": ts, "p": pid, "s": souls[pid].to_json()}
+                    for pid in dict.fromkeys(rec["p"] for rec in events)
+                    if self._since[pid] >= self.snapshot_every
+                ]
+                if due:
+                    for rec, off in zip(due, self._append("snapshots", due)):
+                        self._snapshots.setdefault(rec["p"], []).append((ts, rec["q"], off))
+                        self._since[rec["p"]] = 0
+                        self._prune(rec["p"])
+            if self.compact_after and self._dropped >= self.compact_after:
+                self.compact()
+
+    # ── reads ────────────────────────────────────────────────────────
+    def _read(self, path: Path, offsets: Iterable[int]) -> Iterable[Dict[str, Any]]:
+        with open(path, "rb") as fh:
+            for off in offsets:
+                fh.seek(off)
+                yield json.loads(fh.readline())
+
+    def players(self) -> List[str]:
+        self._load()
+        return list(self._events.keys() | self._snapshots.keys())
+
+    def __contains__(self, player_id: str) -> bool:
+        self._load()
+        return player_id in self._events or player_id in self._snapshots
+
+    def as_of(self, player_id: str, ts: float = float("inf")) -> Optional[SoulMap]:
+        """The player's soul map at ``ts`` (epoch seconds); ``None`` before any event."""
+        self._load()
+        with self._lock:                        # offsets move when the files are compacted
+            events = self._events.get(player_id, ())
+            snaps = self._snapshots.get(player_id, ())
+            cut = bisect_right(snaps, (ts, float("inf"), float("inf")))
+            if not cut and player_id in self._truncated:
+                return None                     # older than the history that is kept
+            soul, after = SoulMap.default(), 0
+            if cut:
+                _, after, off = snaps[cut - 1]
+                soul = SoulMap.from_json(next(iter(self._read(self.snapshots_path, [off])))["s"])
+            tail = [off for t, q, off in events if q > after and t <= ts]
+            if not cut and not tail:
+                return None
+            with track("file_io", "soulmap_history_replay"):
+                for rec in self._read(self.events_path, tail):
+                    soul.apply(decode_delta(rec))
+        return soul
+
+    def close(self) -> None:
+        with self._lock:
+            for fh in self._files.values():
+                fh.close()
+            self._files = {}
+            self._loaded = False
+            self._events.clear()
+            self._snapshots.clear()
+            self._since.clear()
+            self._truncated.clear()
+            self._dropped = 0
+
+
+def rebuild(directory: Path, out: Path) -> Tuple[int, int]:
+    """Replace every player with history in ``out`` by its replayed state.
+
+    Players in ``out`` without any history are kept as they are.  Returns
+    ``(rebuilt, total)`` player counts.
+    """
+    out = Path(out)
+    try:
+        data = json.loads(out.read_text(encoding="utf-8") or "{}")
+    except FileNotFoundError:
+        data = {}
+    history = SoulMapHistory(directory)
+    rebuilt = 0
+    try:
+        for pid in history.players():
+            soul = history.as_of(pid)
+            if soul is not None:
+                data[pid] = soul.to_json()
+                rebuilt += 1
+    finally:
+        history.close()
+    tmp = out.with_name(f".{out.name}.tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, out)
+    return rebuilt, len(data)
+
+
+def _cli() -> None:
+    here = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Soul map history tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rb = sub.add_parser("rebuild", help="write the live soul map file from history")
+    rb.add_argument("--dir", type=Path, default=here / "history")
+    rb.add_argument("--out", type=Path, default=here / "soul_map.json")
+    args = parser.parse_args()
+
+    rebuilt, total = rebuild(args.dir, args.out)
+    print(f"rebuilt {rebuilt} of {total} players in {args.out}")
+
+
+if __name__ == "__main__":
+    _cli()
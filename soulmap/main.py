@@ -1,73 +1,66 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
-
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+
+from common import vecpack
+from common.metrics import instrument
+from soulmap.aggregates import PopulationStats
+from soulmap.catalog import DeltaCatalog
+from soulmap.history import SoulMapHistory
+from soulmap.model import (
+    ARCHETYPES,
+    MOTIVATIONS,
+    SHADOWS,
+    VIRTUES,
+    Delta,
+    SoulMap,
+    apply_batch,
+)
+from soulmap.neighbours import NeighbourIndex
+from soulmap.store import SoulMapRepository
 
 # ------------------------------------------------------------
-# storage helpers
+# storage
 # ------------------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent
 DATA_FILE = BASE_DIR / "soul_map.json"
-
-
-def _load() -> Dict[str, Any]:
-    if DATA_FILE.exists():
-        try:
-            return json.loads(DATA_FILE.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-
-def _save(data: Dict[str, Any]) -> None:
-    DATA_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+# >0 → batch writes, flushed every N seconds and on shutdown; 0 → write after every delta
+FLUSH_INTERVAL = float(os.getenv("SOULMAP_FLUSH_INTERVAL", "1.0"))
+HISTORY_DIR = Path(os.getenv("SOULMAP_HISTORY_DIR", BASE_DIR / "history"))
+SNAPSHOT_EVERY = int(os.getenv("SOULMAP_SNAPSHOT_EVERY", "50"))
+# snapshots kept per player (and the events after the oldest one); 0 → keep all
+HISTORY_KEEP = int(os.getenv("SOULMAP_HISTORY_KEEP", "20"))
+STATS_BINS = int(os.getenv("SOULMAP_STATS_BINS", "20"))
+# weight of intentVec in neighbour distance; 0 → traits only
+NEIGHBOUR_INTENT_WEIGHT = float(os.getenv("SOULMAP_NEIGHBOUR_INTENT_WEIGHT", "0"))
+NEIGHBOUR_NPROBE = int(os.getenv("SOULMAP_NEIGHBOUR_NPROBE", "16"))
 
 
 # ------------------------------------------------------------
 # default soul map structure
 # ------------------------------------------------------------
-VIRTUES = ["courage", "compassion", "wisdom", "creativity", "justice", "temperance"]
-SHADOWS = ["fear", "pride", "apathy"]
-MOTIVATIONS = ["selfActualization", "externalValidation", "collective"]
-ARCHETYPES = [
-    "hero",
-    "rebel",
-    "sage",
-    "caregiver",
-    "magician",
-    "lover",
-    "sovereign",
-    "explorer",
-]
+# the fixed index layout and clamp bounds live in soulmap.model
 
 
 def default_soulmap() -> Dict[str, Any]:
-    return {
-        "coreVirtues": {k: 0.0 for k in VIRTUES},
-        "shadowIndex": {k: 0.0 for k in SHADOWS},
-        "motivations": {k: 0.0 for k in MOTIVATIONS},
-        "archetypeResonance": {k: 0.0 for k in ARCHETYPES},
-        "dynamicStats": {"resilience": 50, "empathy": 50},
-        "npcTrust": {},
-        "intentVec": [0.0] * 768,
-    }
+    """JSON shape of a new player's soul map (intentVec packed as float16)."""
+    return SoulMap.default().to_json()
 
 
 # ------------------------------------------------------------
-# delta map – minimal demo values
+# choice deltas – compiled from the catalog file, hot-reloaded
 # ------------------------------------------------------------
-CHOICE_DELTAS: Dict[str, Dict[str, Any]] = {
-    "battle": {"coreVirtues": {"courage": 0.1}},
-    "hide": {"coreVirtues": {"courage": -0.1}},
-    "help_npc": {
-        "coreVirtues": {"compassion": 0.2},
-        "npcTrust": {"kaiTrust": 5},
-    },
-}
+CATALOG_FILE = Path(os.getenv("SOULMAP_CATALOG", BASE_DIR / "choice_deltas.json"))
+catalog = DeltaCatalog(CATALOG_FILE)
 
 
 # ------------------------------------------------------------
@@ -84,36 +77,212 @@ class SoulMapResponse(BaseModel):
     summary: str
 
 
+class Neighbour(BaseModel):
+    playerId: str
+    distance: float
+
+
+class NeighboursResponse(BaseModel):
+    playerId: str
+    neighbours: List[Neighbour]
+
+
+class BatchDeltaRequest(BaseModel):
+    items: List[DeltaRequest] = Field(..., max_length=50_000)
+
+
+class BatchDeltaResult(BaseModel):
+    index: int
+    playerId: str
+    ok: bool
+    summary: Optional[str] = None       # the player's summary after the whole batch
+    error: Optional[str] = None
+
+
+class BatchDeltaResponse(BaseModel):
+    applied: int
+    results: List[BatchDeltaResult]
+
+
 SoulMapResponse.model_rebuild()
+Neighbour.model_rebuild()
+NeighboursResponse.model_rebuild()
+BatchDeltaRequest.model_rebuild()
+BatchDeltaResult.model_rebuild()
+BatchDeltaResponse.model_rebuild()
 
 
 # ------------------------------------------------------------
 # API setup
 # ------------------------------------------------------------
 app = FastAPI(title="SoulMap API")
+instrument(app, "soulmap")
+repo: SoulMapRepository[SoulMap] = SoulMapRepository(
+    DATA_FILE,
+    SoulMap.default,
+    flush_interval=FLUSH_INTERVAL,
+    decode=SoulMap.from_json,
+    encode=SoulMap.to_json,
+)
+history = SoulMapHistory(
+    HISTORY_DIR, snapshot_every=SNAPSHOT_EVERY, keep_snapshots=HISTORY_KEEP
+)
+stats = PopulationStats(STATS_BINS, source=lambda: (s.traits for s in repo.values()))
+neighbours = NeighbourIndex(
+    intent_weight=NEIGHBOUR_INTENT_WEIGHT, nprobe=NEIGHBOUR_NPROBE, source=repo.items
+)
+
+
+@app.on_event("shutdown")
+def _flush() -> None:
+    repo.close()
+    history.close()
+
+
+@app.get("/v1/soulmap/stats")
+def get_stats() -> Dict[str, Any]:
+    """Population mean, variance and histogram per trait, kept up to date per delta."""
+    with repo.lock:
+        stats.ensure()                  # first call seeds from the stored players
+    return stats.snapshot()
+
+
+@app.get("/v1/soulmap/stats/check")
+def check_stats() -> Dict[str, float]:
+    """Largest difference between the running stats and a recompute over the stored players."""
+    with repo.lock:
+        stats.ensure()
+        return stats.check([s.traits for s in repo.values()])
 
 
 @app.get("/v1/soulmap/{player_id}", response_model=SoulMapResponse)
-def get_soulmap(player_id: str) -> SoulMapResponse:
-    data = _load()
-    traits = data.setdefault(player_id, default_soulmap())
-    _save(data)
-    summary = ", ".join(f"{k}:{v:.2f}" for k, v in traits["coreVirtues"].items())
-    return SoulMapResponse(playerId=player_id, traits=traits, summary=summary)
+def get_soulmap(
+    player_id: str,
+    response: Response,
+    vecFormat: vecpack.VecFormat = "list",
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+) -> Any:
+    """``fields`` (comma-separated) projects ``traits``; 304 if ``If-None-Match`` still holds."""
+    with repo.lock:                     # a consistent copy; hash and serialise outside
+        soul = repo.get(player_id).copy()
+    tag = _etag(soul, vecFormat, fields)
+    if if_none_match and _etag_matches(if_none_match, tag):
+        return Response(status_code=304, headers={"ETag": tag})
+    response.headers["ETag"] = tag
+    return _response(player_id, soul, vecFormat, fields)
 
 
 @app.post("/v1/soulmap/delta", response_model=SoulMapResponse)
-def apply_delta(req: DeltaRequest) -> SoulMapResponse:
-    data = _load()
-    traits = data.setdefault(req.playerId, default_soulmap())
-    delta = CHOICE_DELTAS.get(req.choiceId)
+def apply_delta(
+    req: DeltaRequest,
+    vecFormat: vecpack.VecFormat = "list",
+    fields: Optional[str] = None,
+    changesOnly: bool = False,
+) -> SoulMapResponse:
+    """Apply a choice; ``changesOnly`` returns just the values the delta changed."""
+    if changesOnly and fields:
+        raise HTTPException(400, "use either fields or changesOnly")
+    delta = catalog.get(req.choiceId)
     if delta is None:
         raise HTTPException(404, "unknown choiceId")
-    _apply_delta(traits, delta)
-    data[req.playerId] = traits
-    _save(data)
-    summary = ", ".join(f"{k}:{v:.2f}" for k, v in traits["coreVirtues"].items())
-    return SoulMapResponse(playerId=req.playerId, traits=traits, summary=summary)
+
+    def _apply(soul: SoulMap) -> None:
+        after = soul.copy()
+        after.apply(delta)
+        history.record(                         # logged first: a failed append changes nothing
+            req.playerId, req.choiceId, delta, after, baseline=baseline.get(req.playerId)
+        )
+        _adopt(soul, after)
+
+    with repo.lock:
+        stats.ensure()
+        neighbours.ensure()
+        baseline = _baseline([req.playerId])
+        old = repo.get(req.playerId).traits.copy() if req.playerId in repo else None
+        before = repo.get(req.playerId).copy() if changesOnly else None
+        soul = repo.update(req.playerId, _apply)
+        stats.replace(old, soul.traits)
+        neighbours.upsert(req.playerId, soul)
+        soul = soul.copy()              # respond from a snapshot; flushed once released
+    if before is not None:
+        return SoulMapResponse(
+            playerId=req.playerId,
+            traits=soul.changes(before, vecFormat),
+            summary=soul.summary(),
+        )
+    return _response(req.playerId, soul, vecFormat, fields)
+
+
+@app.get("/v1/soulmap/{player_id}/history", response_model=SoulMapResponse)
+def get_soulmap_as_of(
+    player_id: str,
+    asOf: datetime,
+    vecFormat: vecpack.VecFormat = "list",
+    fields: Optional[str] = None,
+) -> SoulMapResponse:
+    """The player's soul map as it was at ``asOf`` (ISO 8601 or epoch seconds)."""
+    soul = history.as_of(player_id, asOf.timestamp())
+    if soul is None:
+        raise HTTPException(404, "no history for player at that time")
+    return _response(player_id, soul, vecFormat, fields)
+
+
+@app.get("/v1/soulmap/{player_id}/neighbours", response_model=NeighboursResponse)
+def get_neighbours(player_id: str, k: int = Query(10, ge=1, le=100)) -> NeighboursResponse:
+    """Players with the most similar soul maps ("kindred souls"), nearest first."""
+    with repo.lock:
+        neighbours.ensure()
+    if player_id not in neighbours:
+        raise HTTPException(404, "player has no soul map yet")
+    found = neighbours.query(player_id, k)
+    return NeighboursResponse(
+        playerId=player_id,
+        neighbours=[Neighbour(playerId=pid, distance=d) for pid, d in found],
+    )
+
+
+@app.post("/v1/soulmap/delta/batch", response_model=BatchDeltaResponse)
+def apply_delta_batch(req: BatchDeltaRequest) -> BatchDeltaResponse:
+    """Apply many ``(playerId, choiceId)`` pairs in order with a single commit."""
+    deltas = catalog.refresh().deltas            # one catalog version per batch
+    players: Dict[str, int] = {}
+    ops: List[tuple[int, Delta]] = []
+    events: List[tuple[str, str, Delta]] = []
+    results: List[BatchDeltaResult] = []
+    for n, item in enumerate(req.items):
+        delta = deltas.get(item.choiceId)
+        if delta is None:
+            results.append(BatchDeltaResult(
+                index=n, playerId=item.playerId, ok=False, error="unknown choiceId"
+            ))
+            continue
+        ops.append((players.setdefault(item.playerId, len(players)), delta))
+        events.append((item.playerId, item.choiceId, delta))
+        results.append(BatchDeltaResult(index=n, playerId=item.playerId, ok=True))
+
+    if ops:
+
+        def _apply(souls: List[SoulMap]) -> None:
+            after = [s.copy() for s in souls]
+            apply_batch(after, ops)
+            history.record_many(events, dict(zip(players, after)), baseline=baseline)
+            for soul, new in zip(souls, after):
+                _adopt(soul, new)
+
+        with repo.lock:
+            stats.ensure()
+            neighbours.ensure()
+            baseline = _baseline(players)
+            old = [repo.get(pid).traits.copy() for pid in players if pid in repo]
+            souls = repo.update_many(list(players), _apply)
+            stats.replace(np.array(old) if old else None, np.stack([s.traits for s in souls]))
+            neighbours.upsert_many(list(players), souls)
+            summaries = {pid: souls[i].summary() for pid, i in players.items()}
+        for r in results:
+            if r.ok:
+                r.summary = summaries[r.playerId]
+    return BatchDeltaResponse(applied=len(ops), results=results)
 
 
 @app.get("/soulmap/ui")
@@ -128,24 +297,38 @@ def soulmap_ui() -> str:
 # helpers
 # ------------------------------------------------------------
 
-def _apply_delta(target: Dict[str, Any], delta: Dict[str, Any]) -> None:
-    for key, value in delta.items():
-        if isinstance(value, dict):
-            node = target.setdefault(key, {})
-            for sub, dv in value.items():
-                node[sub] = _clamp(node.get(sub, 0.0) + dv, key, sub)
-        elif key == "intentVec":
-            target[key] = _add_vectors(target.get(key, [0.0] * 768), value)
+def _response(
+    player_id: str, soul: SoulMap, vec_format: str, fields: Optional[str] = None
+) -> SoulMapResponse:
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        traits = soul.to_json(vec_format, wanted)
+    except KeyError as exc:
+        raise HTTPException(400, f"unknown field '{exc.args[0]}'") from exc
+    return SoulMapResponse(playerId=player_id, traits=traits, summary=soul.summary())
+
+
+def _baseline(player_ids: Iterable[str]) -> Dict[str, SoulMap]:
+    """Pre-delta state of stored players that have no history yet (call under ``repo.lock``)."""
+    return {
+        pid: repo.get(pid).copy() for pid in player_ids if pid in repo and pid not in history
+    }
+
 
+def _adopt(soul: SoulMap, new: SoulMap) -> None:
+    """Move ``new``'s state into the stored ``soul`` once its history is on record."""
+    soul.traits, soul.npc_trust, soul.intent = new.traits, new.npc_trust, new.intent
 
-def _add_vectors(a: List[float], b: List[float]) -> List[float]:
-    return [x + y for x, y in zip(a, b)]
 
+def _etag(soul: SoulMap, *variant: Optional[str]) -> str:
+    """Strong ETag over the player's state and the requested representation."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(soul.traits.tobytes())
+    h.update(soul.intent.tobytes())
+    h.update(json.dumps([soul.npc_trust, variant], sort_keys=True).encode("utf-8"))
+    return f'"{h.hexdigest()}"'
 
-def _clamp(val: float, section: str, field: str) -> float:
-    if section in {"dynamicStats", "npcTrust"}:
-        return max(0.0, min(100.0, val))
-    if section == "motivations":
-        return max(0.0, min(1.0, val))
-    return max(-1.0, min(1.0, val))
 
+def _etag_matches(header: str, tag: str) -> bool:
+    candidates = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return tag in candidates or "*" in candidates
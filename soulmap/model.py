@@ -0,0 +1,218 @@
+"""Typed, array-backed soul map.
+
+Every bounded trait lives at a fixed index of one float64 vector::
+
+    coreVirtues | shadowIndex | motivations | archetypeResonance | dynamicStats
+
+with per-index ``LOWER``/``UPPER`` clamp bounds, so applying a delta is one
+vector add and one ``np.clip``.  ``npcTrust`` is open-ended and stays a small
+dict; ``intentVec`` is a float32 array.  ``SoulMap.from_json``/``to_json``
+convert from/to the JSON shape used on disk and by the API.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from common import vecpack
+
+VIRTUES = ["courage", "compassion", "wisdom", "creativity", "justice", "temperance"]
+SHADOWS = ["fear", "pride", "apathy"]
+MOTIVATIONS = ["selfActualization", "externalValidation", "collective"]
+ARCHETYPES = [
+    "hero",
+    "rebel",
+    "sage",
+    "caregiver",
+    "magician",
+    "lover",
+    "sovereign",
+    "explorer",
+]
+STATS = ["resilience", "empathy"]
+INTENT_DIMS = 768
+
+# section → (fields, lower, upper, default)
+SECTIONS: Dict[str, tuple[list[str], float, float, float]] = {
+    "coreVirtues": (VIRTUES, -1.0, 1.0, 0.0),
+    "shadowIndex": (SHADOWS, -1.0, 1.0, 0.0),
+    "motivations": (MOTIVATIONS, 0.0, 1.0, 0.0),
+    "archetypeResonance": (ARCHETYPES, -1.0, 1.0, 0.0),
+    "dynamicStats": (STATS, 0.0, 100.0, 50.0),
+}
+NPC_TRUST_BOUNDS = (0.0, 100.0)
+
+INDEX: Dict[tuple[str, str], int] = {}
+SLICES: Dict[str, slice] = {}
+_lower, _upper, _default = [], [], []
+for _section, (_fields, _lo, _hi, _dv) in SECTIONS.items():
+    SLICES[_section] = slice(len(INDEX), len(INDEX) + len(_fields))
+    for _f in _fields:
+        INDEX[(_section, _f)] = len(INDEX)
+        _lower.append(_lo)
+        _upper.append(_hi)
+        _default.append(_dv)
+N_TRAITS = len(INDEX)
+FIELDS = list(INDEX)                                    # index → (section, field)
+LOWER = np.array(_lower)
+UPPER = np.array(_upper)
+DEFAULTS = np.array(_default)
+del _section, _fields, _lo, _hi, _dv, _f, _lower, _upper, _default
+
+
+@dataclass(frozen=True)
+class Delta:
+    """A choice delta compiled against the fixed layout."""
+
+    traits: np.ndarray                                  # (N_TRAITS,) additive
+    npc_trust: Mapping[str, float] = field(default_factory=dict)
+    intent: np.ndarray | None = None                    # (INTENT_DIMS,) additive
+
+    @classmethod
+    def compile(cls, raw: Mapping[str, Any]) -> "Delta":
+        """Compile the nested JSON form; unknown sections or fields raise ``KeyError``."""
+        traits = np.zeros(N_TRAITS)
+        npc: Dict[str, float] = {}
+        intent = None
+        for section, value in raw.items():
+            if section == "intentVec":
+                intent = vecpack.to_array(value)
+                if intent.shape != (INTENT_DIMS,):
+                    raise ValueError(f"intentVec delta must have {INTENT_DIMS} values")
+            elif section == "npcTrust":
+                npc.update({k: float(v) for k, v in value.items()})
+            elif section in SECTIONS:
+                for name, dv in value.items():
+                    traits[INDEX[(section, name)]] += float(dv)
+            else:
+                raise KeyError(section)
+        return cls(traits, npc, intent)
+
+
+@dataclass
+class SoulMap:
+    traits: np.ndarray = field(default_factory=lambda: DEFAULTS.copy())
+    npc_trust: Dict[str, float] = field(default_factory=dict)
+    intent: np.ndarray = field(default_factory=lambda: np.zeros(INTENT_DIMS, np.float32))
+
+    @classmethod
+    def default(cls) -> "SoulMap":
+        return cls()
+
+    # ── delta ────────────────────────────────────────────────────────
+    def apply(self, delta: Delta) -> None:
+        np.clip(self.traits + delta.traits, LOWER, UPPER, out=self.traits)
+        self._apply_extras(delta)
+
+    def _apply_extras(self, delta: Delta) -> None:
+        lo, hi = NPC_TRUST_BOUNDS
+        for name, dv in delta.npc_trust.items():
+            self.npc_trust[name] = max(lo, min(hi, self.npc_trust.get(name, 0.0) + dv))
+        if delta.intent is not None:
+            self.intent += delta.intent
+
+    # ── JSON boundary ───────────────────────────────────────────────
+    def section(self, name: str) -> Dict[str, float]:
+        fields = SECTIONS[name][0]
+        return dict(zip(fields, self.traits[SLICES[name]].tolist()))
+
+    def summary(self) -> str:
+        return ", ".join(f"{k}:{v:.2f}" for k, v in self.section("coreVirtues").items())
+
+    def to_json(
+        self, vec_format: str = "f16", fields: Iterable[str] | None = None
+    ) -> Dict[str, Any]:
+        """JSON shape, optionally projected to ``fields``.
+
+        ``fields`` names sections (``coreVirtues``, ``npcTrust``, ``intentVec``)
+        or single values (``coreVirtues.courage``, ``npcTrust.kaiTrust``);
+        ``intentVec`` is only packed when asked for.  Unknown names raise
+        ``KeyError``; an npc without a trust value is simply left out.
+        """
+        if fields is None:
+            fields = [*SECTIONS, "npcTrust", "intentVec"]
+        out: Dict[str, Any] = {}
+        for name in fields:
+            section, _, key = name.partition(".")
+            if section in SECTIONS:
+                if key:
+                    value = float(self.traits[INDEX[(section, key)]])
+                    out.setdefault(section, {})[key] = value
+                else:
+                    out[section] = self.section(section)
+            elif section == "npcTrust":
+                if not key:
+                    out["npcTrust"] = dict(self.npc_trust)
+                elif key in self.npc_trust:
+                    out.setdefault("npcTrust", {})[key] = self.npc_trust[key]
+            elif name == "intentVec":
+                out["intentVec"] = vecpack.as_format(self.intent, vec_format)
+            else:
+                raise KeyError(name)
+        return out
+
+    def changes(self, before: "SoulMap", vec_format: str = "f16") -> Dict[str, Any]:
+        """JSON of just the values that differ from ``before``."""
+        out: Dict[str, Any] = {}
+        for i in np.flatnonzero(self.traits != before.traits).tolist():
+            section, key = FIELDS[i]
+            out.setdefault(section, {})[key] = float(self.traits[i])
+        npc = {k: v for k, v in self.npc_trust.items() if before.npc_trust.get(k) != v}
+        if npc:
+            out["npcTrust"] = npc
+        if not np.array_equal(self.intent, before.intent):
+            out["intentVec"] = vecpack.as_format(self.intent, vec_format)
+        return out
+
+    def copy(self) -> "SoulMap":
+        return SoulMap(self.traits.copy(), dict(self.npc_trust), self.intent.copy())
+
+    @classmethod
+    def from_json(cls, data: Mapping[str, Any]) -> "SoulMap":
+        soul = cls()
+        for section, values in data.items():
+            if section in SECTIONS and isinstance(values, Mapping):
+                for name, v in values.items():
+                    idx = INDEX.get((section, name))
+                    if idx is not None:
+                        soul.traits[idx] = float(v)
+        soul.npc_trust = {k: float(v) for k, v in (data.get("npcTrust") or {}).items()}
+        if data.get("intentVec"):
+            vec = vecpack.to_array(data["intentVec"])
+            if vec.shape == (INTENT_DIMS,):
+                soul.intent = vec.copy()
+        return soul
+
+
+def apply_batch(souls: Sequence[SoulMap], ops: Sequence[Tuple[int, Delta]]) -> None:
+    """Apply ``(soul index, delta)`` pairs in order, vectorised across players.
+
+    Traits of all touched players are stacked into one matrix.  The k-th delta
+    of every player is applied in round k with one add and one clip over the
+    rows involved, so clamping behaves exactly as applying the deltas one by
+    one while the number of NumPy passes is the largest number of deltas any
+    single player receives, not the batch size.
+    """
+    if not ops:
+        return
+    matrix = np.stack([s.traits for s in souls])
+    rounds: List[List[Tuple[int, Delta]]] = []
+    depth: Dict[int, int] = {}
+    for i, delta in ops:
+        r = depth.get(i, 0)
+        depth[i] = r + 1
+        if r == len(rounds):
+            rounds.append([])
+        rounds[r].append((i, delta))
+    for batch in rounds:
+        rows = np.fromiter((i for i, _ in batch), np.intp, len(batch))
+        step = np.stack([d.traits for _, d in batch])
+        matrix[rows] = np.clip(matrix[rows] + step, LOWER, UPPER)
+    for soul, row in zip(souls, matrix):
+        soul.traits[:] = row
+    for i, delta in ops:
+        if delta.npc_trust or delta.intent is not None:
+            souls[i]._apply_extras(delta)
@@ -0,0 +1,294 @@
+"""Approximate nearest-neighbour index over soul map trait vectors.
+
+Each player is one float32 row::
+
+    coreVirtues | shadowIndex | motivations | archetypeResonance [| intent]
+
+where the optional ``intent`` part is the unit ``intentVec`` projected to
+``intent_dims`` dimensions with a fixed random projection and scaled by
+``intent_weight`` (0 leaves it out).  Rows live in one growable matrix and
+are partitioned into inverted lists around k-means centroids (IVF).  A query
+scans only the ``nprobe`` lists whose centroids are nearest, so its cost
+grows with ``nprobe · √players`` instead of the population.
+
+Deltas re-embed the player's row and move it between lists in O(lists).
+The centroids are retrained on a background thread whenever the population
+has doubled since the last training; until ``min_train`` players exist
+everything sits in a single list and queries are exact.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from soulmap.model import INTENT_DIMS, N_TRAITS, SLICES, SoulMap
+
+TRAIT_SECTIONS = ("coreVirtues", "shadowIndex", "motivations", "archetypeResonance")
+_COLS = np.concatenate([np.arange(N_TRAITS)[SLICES[s]] for s in TRAIT_SECTIONS])
+
+
+def _sqdist(
+    rows: np.ndarray, centres: np.ndarray, chunk: int = 16384
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Index and squared distance of each row's nearest centre, in chunks."""
+    c2 = (centres * centres).sum(axis=1)
+    best = np.empty(len(rows), np.intp)
+    dist = np.empty(len(rows), np.float32)
+    for lo in range(0, len(rows), chunk):
+        part = rows[lo:lo + chunk]
+        d = c2 - 2.0 * (part @ centres.T)
+        best[lo:lo + chunk] = i = d.argmin(axis=1)
+        dist[lo:lo + chunk] = d[np.arange(len(part)), i] + (part * part).sum(axis=1)
+    return best, dist
+
+
+def kmeans(
+    data: np.ndarray, n: int, *, iters: int = 10, rng: np.random.Generator
+) -> np.ndarray:
+    """Plain Lloyd iterations; empty clusters are reseeded from random rows."""
+    centres = data[rng.choice(len(data), n, replace=False)].copy()
+    for _ in range(iters):
+        assign, _ = _sqdist(data, centres)
+        counts = np.bincount(assign, minlength=n)
+        sums = np.zeros_like(centres)
+        np.add.at(sums, assign, data)
+        empty = counts == 0
+        centres[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centres[empty] = data[rng.choice(len(data), int(empty.sum()))]
+    return centres
+
+
+class NeighbourIndex:
+    """IVF index from player id to trait row.
+
+    ``source`` yields ``(player_id, SoulMap)`` for every stored player and
+    seeds the index on the first :meth:`ensure`.
+    """
+
+    def __init__(
+        self,
+        *,
+        intent_weight: float = 0.0,
+        intent_dims: int = 16,
+        nprobe: int = 16,
+        min_train: int = 4096,
+        source: Callable[[], Iterable[Tuple[str, SoulMap]]] | None = None,
+        seed: int = 0,
+    ) -> None:
+        self.intent_weight = intent_weight
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self._source = source
+        self._ready = False
+        self._rng = np.random.default_rng(seed)
+        self._proj = (
+            self._rng.standard_normal((INTENT_DIMS, intent_dims)).astype(np.float32)
+            / np.sqrt(intent_dims)
+            if intent_weight
+            else None
+        )
+        self.dim = len(_COLS) + (intent_dims if intent_weight else 0)
+        self._lock = threading.RLock()
+        self._x = np.empty((0, self.dim), np.float32)       # slot → row
+        self._list = np.empty(0, np.intp)                    # slot → inverted list
+        self._pos = np.empty(0, np.intp)                     # slot → position in list
+        self._ids: List[str] = []                            # slot → player id
+        self._slots: dict[str, int] = {}
+        self._trained_at = 0
+        self._train_lock = threading.Lock()
+        self._training = False
+        self._touched: set[int] = set()                      # slots written mid-fit
+        self._trainer: threading.Thread | None = None
+        self._reset_lists(np.zeros((1, self.dim), np.float32))
+
+    # ── embedding ────────────────────────────────────────────────────
+    def features(self, souls: Sequence[SoulMap]) -> np.ndarray:
+        rows = np.empty((len(souls), self.dim), np.float32)
+        if not souls:
+            return rows
+        rows[:, : len(_COLS)] = np.stack([s.traits[_COLS] for s in souls])
+        if self._proj is not None:
+            intent = np.stack([s.intent for s in souls]).astype(np.float32)
+            norm = np.linalg.norm(intent, axis=1, keepdims=True)
+            unit = np.divide(intent, norm, out=np.zeros_like(intent), where=norm > 0)
+            rows[:, len(_COLS):] = self.intent_weight * (unit @ self._proj)
+        return rows
+
+    # ── inverted lists ───────────────────────────────────────────────
+    def _reset_lists(self, centres: np.ndarray) -> None:
+        self._centres = centres.astype(np.float32)
+        self._members = [np.empty(8, np.intp) for _ in range(len(centres))]
+        self._sizes = [0] * len(centres)
+
+    def _push(self, c: int, slot: int) -> None:
+        n = self._sizes[c]
+        if n == len(self._members[c]):
+            grown = np.empty(2 * n, np.intp)
+            grown[:n] = self._members[c]
+            self._members[c] = grown
+        self._members[c][n] = slot
+        self._list[slot] = c
+        self._pos[slot] = n
+        self._sizes[c] = n + 1
+
+    def _pop(self, slot: int) -> None:
+        c, i = self._list[slot], self._pos[slot]
+        n = self._sizes[c] = self._sizes[c] - 1
+        last = self._members[c][n]
+        self._members[c][i] = last
+        self._pos[last] = i
+
+    def _grow(self, need: int) -> None:
+        cap = len(self._x)
+        if need <= cap:
+            return
+        cap = max(need, 2 * cap, 1024)
+        for name, shape in (("_x", (cap, self.dim)), ("_list", (cap,)), ("_pos", (cap,))):
+            old = getattr(self, name)
+            new = np.empty(shape, old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    # ── writes ───────────────────────────────────────────────────────
+    def ensure(self) -> None:
+        if self._ready:
+            return
+        with self._lock:
+            if not self._ready:
+                pairs = list(self._source()) if self._source else []
+                self._ready = True
+                if pairs:
+                    ids, souls = zip(*pairs)
+                    self.upsert_many(ids, souls)
+
+    def upsert(self, player_id: str, soul: SoulMap) -> None:
+        self.upsert_many([player_id], [soul])
+
+    def upsert_many(self, player_ids: Sequence[str], souls: Sequence[SoulMap]) -> None:
+        self.add_rows(player_ids, self.features(souls))
+
+    def add_rows(self, player_ids: Sequence[str], rows: np.ndarray) -> None:
+        """Insert or replace already-embedded rows (see :meth:`features`)."""
+        with self._lock:
+            self._grow(len(self._ids) + len(player_ids))
+            assign, _ = _sqdist(rows, self._centres)
+            for pid, row, c in zip(player_ids, rows, assign.tolist()):
+                slot = self._slots.get(pid)
+                if slot is None:
+                    slot = self._slots[pid] = len(self._ids)
+                    self._ids.append(pid)
+                elif self._list[slot] == c:
+                    self._x[slot] = row
+                    continue
+                else:
+                    self._pop(slot)
+                self._x[slot] = row
+                self._push(c, slot)
+            n = len(self._ids)
+            if self._training:
+                self._touched.update(self._slots[pid] for pid in player_ids)
+            elif n >= self.min_train and n >= 2 * self._trained_at:
+                self._training = True
+                self._trained_at = n
+                self._trainer = threading.Thread(
+                    target=self.train, name="neighbour-retrain", daemon=True
+                )
+                self._trainer.start()
+
+    def train(self, *, sample: int = 65536) -> None:
+        """Refit ``√players`` centroids on a sample and rebuild every list.
+
+        The fit runs on a copy of the rows without holding the index lock;
+        rows written meanwhile are re-assigned when the new lists are swapped
+        in, so updates and queries only wait for the swap.
+        """
+        with self._train_lock:
+            with self._lock:
+                n = len(self._ids)
+                data = self._x[:n].copy()
+                self._touched = set()
+                self._training = True
+            try:
+                if not n:
+                    return
+                pick = data if n <= sample else data[self._rng.choice(n, sample, replace=False)]
+                centres = kmeans(pick, max(1, min(int(np.sqrt(n)), len(pick))), rng=self._rng)
+                assign, _ = _sqdist(data, centres)
+                with self._lock:
+                    self._install(centres, assign)
+            finally:
+                with self._lock:
+                    self._training = False
+                    self._touched = set()
+
+    def _install(self, centres: np.ndarray, assign: np.ndarray) -> None:
+        """Swap in new lists; ``assign`` covers the rows as they were at fit time."""
+        n = len(self._ids)
+        full = np.empty(n, np.intp)
+        full[: len(assign)] = assign
+        redo = np.fromiter(self._touched | set(range(len(assign), n)), np.intp)
+        if len(redo):
+            full[redo], _ = _sqdist(self._x[redo], centres)
+        self._reset_lists(centres)
+        order = np.argsort(full, kind="stable")
+        counts = np.bincount(full, minlength=len(centres))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self._list[:n] = full
+        self._pos[order] = np.arange(n) - starts[full[order]]
+        for c, (lo, cnt) in enumerate(zip(starts.tolist(), counts.tolist())):
+            self._members[c] = np.empty(max(8, 2 * cnt), np.intp)
+            self._members[c][:cnt] = order[lo:lo + cnt]
+            self._sizes[c] = cnt
+        self._trained_at = max(self._trained_at, n)
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until a background retrain (if any) has finished."""
+        trainer = self._trainer
+        if trainer is not None:
+            trainer.join(timeout)
+
+    # ── reads ────────────────────────────────────────────────────────
+    def search(
+        self, row: np.ndarray, k: int, *, exclude: str | None = None, nprobe: int | None = None
+    ) -> List[Tuple[str, float]]:
+        """``k`` nearest ``(player_id, distance)`` pairs to an embedded row."""
+        with self._lock:
+            probe = nprobe or self.nprobe
+            c_dist = ((self._centres - row) ** 2).sum(axis=1)
+            lists = (
+                np.argpartition(c_dist, probe - 1)[:probe]
+                if probe < len(c_dist)
+                else range(len(c_dist))
+            )
+            cand = np.concatenate([self._members[c][: self._sizes[c]] for c in lists])
+            diff = self._x[cand] - row
+            dist = np.einsum("ij,ij->i", diff, diff)
+            ids = self._ids
+            want = min(k + (exclude is not None), len(cand))
+            if not want:
+                return []
+            top = np.argpartition(dist, want - 1)[:want]
+            top = top[np.argsort(dist[top])]
+            out = [
+                (ids[s], float(np.sqrt(d)))
+                for s, d in zip(cand[top].tolist(), dist[top].tolist())
+            ]
+        return [(pid, d) for pid, d in out if pid != exclude][:k]
+
+    def query(
+        self, player_id: str, k: int = 10, *, nprobe: int | None = None
+    ) -> List[Tuple[str, float]]:
+        """Nearest other players to ``player_id``; ``KeyError`` if it is not indexed."""
+        with self._lock:
+            row = self._x[self._slots[player_id]].copy()
+        return self.search(row, k, exclude=player_id, nprobe=nprobe)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._ids)
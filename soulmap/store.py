@@ -0,0 +1,233 @@
+"""In-memory soul map repository with dirty tracking.
+
+``soul_map.json`` is read once; after that reads are served from memory and
+never touch the disk.  Unknown players get a fresh default that is *not*
+stored until something changes it.  Mutations mark the player dirty and a
+flush rewrites the file from cached per-player JSON fragments, re-serialising
+only the dirty players.
+
+``flush_interval=0`` flushes after every mutation; a positive value flushes
+from a background timer instead, and ``flush()``/``close()`` force it.  The
+file itself is written outside the repository lock: a mutation made while a
+caller holds :attr:`~SoulMapRepository.lock` is flushed when that caller lets
+go of it.
+
+Players are held as whatever ``decode`` returns (``SoulMap`` in the app) and
+converted back with ``encode`` only when they are written.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, List, TypeVar
+
+from common.metrics import track
+
+P = TypeVar("P")
+
+
+def _identity(obj: Any) -> Any:
+    return obj
+
+
+class _CallerLock:
+    """The repository's ``RLock`` as handed to callers; runs ``on_release`` when the last hold ends."""
+
+    def __init__(self, lock: threading.RLock, on_release: Callable[[], Any]) -> None:
+        self._lock = lock
+        self._on_release = on_release
+        self.depth = 0                  # only the owning thread changes it
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not self._lock.acquire(blocking, timeout):
+            return False
+        self.depth += 1
+        return True
+
+    def release(self) -> None:
+        self.depth -= 1
+        last = self.depth == 0
+        self._lock.release()
+        if last:
+            self._on_release()
+
+    def __enter__(self) -> "_CallerLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+class SoulMapRepository(Generic[P]):
+    def __init__(
+        self,
+        path: Path,
+        default_factory: Callable[[], P],
+        *,
+        flush_interval: float = 0.0,
+        decode: Callable[[Any], P] = _identity,
+        encode: Callable[[P], Any] = _identity,
+    ) -> None:
+        self.path = Path(path)
+        self.default_factory = default_factory
+        self.flush_interval = flush_interval
+        self._decode = decode
+        self._encode = encode
+        self._lock = threading.RLock()
+        self._caller_lock = _CallerLock(self._lock, self._released)
+        self._players: Dict[str, P] | None = None          # loaded lazily
+        self._fragments: Dict[str, str] = {}                # serialised clean players
+        self._dirty: set[str] = set()
+        self._timer: threading.Timer | None = None
+        self._write_lock = threading.Lock()                # orders file writes
+        self._generation = 0                                # last snapshot taken
+        self._written = 0                                   # last snapshot on disk
+
+    # loading ---------------------------------------------------------
+    def _data(self) -> Dict[str, P]:
+        if self._players is None:
+            with self._lock:
+                if self._players is None:
+                    self._players = self._read()
+        return self._players
+
+    def _read(self) -> Dict[str, P]:
+        try:
+            with track("file_io", "soulmap_load"):
+                data = json.loads(self.path.read_text(encoding="utf-8") or "{}")
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {pid: self._decode(raw) for pid, raw in data.items()}
+
+    # reads -----------------------------------------------------------
+    def get(self, player_id: str) -> P:
+        """Traits for ``player_id``; a transient default if none are stored.
+
+        The returned object is the cached copy – treat it as read-only and go
+        through :meth:`update` to change it.
+        """
+        traits = self._data().get(player_id)
+        return traits if traits is not None else self.default_factory()
+
+    def values(self) -> List[P]:
+        with self._lock:
+            return list(self._data().values())
+
+    def items(self) -> List[tuple[str, P]]:
+        with self._lock:
+            return list(self._data().items())
+
+    @property
+    def lock(self) -> _CallerLock:
+        """Hold to make several calls (e.g. a read followed by an update) atomic.
+
+        With ``flush_interval=0`` updates made under it are written once it is
+        released, never while it is held.
+        """
+        return self._caller_lock
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._data()
+
+    def __len__(self) -> int:
+        return len(self._data())
+
+    # writes ----------------------------------------------------------
+    def update(self, player_id: str, fn: Callable[[P], None]) -> P:
+        """Apply ``fn`` to the player's traits in place and mark them dirty."""
+        with self._lock:
+            data = self._data()
+            traits = data.get(player_id)
+            if traits is None:
+                traits = data[player_id] = self.default_factory()
+            fn(traits)
+            self._dirty.add(player_id)
+        self._schedule()
+        return traits
+
+    def update_many(self, player_ids: List[str], fn: Callable[[List[P]], None]) -> List[P]:
+        """Apply ``fn`` to several players at once; one flush for all of them."""
+        with self._lock:
+            data = self._data()
+            items = []
+            for pid in player_ids:
+                item = data.get(pid)
+                if item is None:
+                    item = data[pid] = self.default_factory()
+                items.append(item)
+            fn(items)
+            self._dirty.update(player_ids)
+        self._schedule()
+        return items
+
+    @property
+    def dirty(self) -> frozenset[str]:
+        return frozenset(self._dirty)
+
+    def _schedule(self) -> None:
+        if self.flush_interval <= 0:
+            if not self._caller_lock.depth:     # else the holder flushes on release
+                self.flush()
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _released(self) -> None:
+        if self.flush_interval <= 0 and self._dirty:
+            self.flush()
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Write the file if anything changed; returns the number of dirty players.
+
+        Only the dirty fragments are re-serialised under the lock; joining the
+        body and writing it happen outside, so reads and deltas never wait on
+        the disk.
+        """
+        with self._lock:
+            if not self._dirty or self._players is None:
+                return 0
+            for pid in self._dirty | (self._players.keys() - self._fragments.keys()):
+                self._fragments[pid] = json.dumps(
+                    self._encode(self._players[pid]), separators=(",", ":")
+                )
+            fragments = list(self._fragments.items())
+            flushed = set(self._dirty)
+            self._dirty.clear()
+            self._generation += 1
+            generation = self._generation
+        body = ",\n".join(f"{json.dumps(pid)}:{frag}" for pid, frag in fragments)
+        with self._write_lock:
+            if generation < self._written:          # a newer state is already on disk
+                return len(flushed)
+            try:
+                with track("file_io", "soulmap_flush"):
+                    tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+                    tmp.write_text("{" + body + "}\n", encoding="utf-8")
+                    os.replace(tmp, self.path)
+            except OSError:
+                with self._lock:
+                    self._dirty |= flushed          # retried by the next flush
+                raise
+            self._written = generation
+        return len(flushed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.flush()
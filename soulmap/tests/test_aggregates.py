@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from soulmap.aggregates import PopulationStats
+from soulmap.model import LOWER, N_TRAITS, UPPER
+
+
+def test_incremental_matches_rebuild():
+    rng = np.random.default_rng(7)
+    rows = {pid: rng.uniform(LOWER, UPPER) for pid in range(50)}
+    live = PopulationStats(bins=10)
+    live.ensure()
+    for row in rows.values():
+        live.replace(None, row)
+    for pid in rng.choice(50, 200):                 # players changing over time
+        new = np.clip(rows[pid] + rng.normal(0, 0.3, N_TRAITS), LOWER, UPPER)
+        live.replace(rows[pid], new)
+        rows[pid] = new
+
+    fresh = PopulationStats(bins=10)
+    fresh.rebuild(rows.values())
+    a, b = live.snapshot(), fresh.snapshot()
+    assert a["players"] == b["players"] == 50
+    for name, section in b["sections"].items():
+        for field, want in section["fields"].items():
+            got = a["sections"][name]["fields"][field]
+            assert got["counts"] == want["counts"]
+            assert sum(got["counts"]) == 50
+            assert got["mean"] == pytest.approx(want["mean"])
+            assert got["var"] == pytest.approx(want["var"], abs=1e-9)
+
+
+def test_upper_bound_lands_in_last_bucket_and_source_seeds():
+    stats = PopulationStats(bins=4, source=lambda: [UPPER.copy(), LOWER.copy()])
+    stats.ensure()
+    courage = stats.snapshot()["sections"]["coreVirtues"]["fields"]["courage"]
+    assert courage["counts"] == [1, 0, 0, 1]
+    assert courage["mean"] == 0.0
+    assert courage["var"] == pytest.approx(1.0)
+
+
+def test_check_reports_drift():
+    rng = np.random.default_rng(3)
+    rows = [rng.uniform(LOWER, UPPER) for _ in range(20)]
+    stats = PopulationStats(bins=10, source=lambda: rows)
+    stats.ensure()
+    clean = stats.check(rows)
+    assert clean["players"] == clean["counts"] == 0
+    assert clean["mean"] == pytest.approx(0, abs=1e-12)
+
+    stats.replace(None, UPPER.copy())               # an update the store never saw
+    drifted = stats.check(rows)
+    assert drifted["players"] == 1 and drifted["counts"] == 1
+    assert drifted["mean"] > 0
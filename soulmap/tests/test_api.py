@@ -18,7 +18,9 @@ def import_app():
 
 
 @pytest.fixture(autouse=True)
-def clean_file():
+def clean_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOULMAP_HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setenv("SOULMAP_FLUSH_INTERVAL", "0")     # write-through: no stray timers
     DATA_FILE.write_text("{}", encoding="utf-8")
 
 
@@ -42,3 +44,151 @@ def test_apply_delta():
     data = json.loads(DATA_FILE.read_text())
     assert data["hero"]["coreVirtues"]["courage"] > 0
 
+
+
+def test_intent_vec_is_packed_on_disk_and_opt_in_on_the_wire():
+    client = TestClient(import_app())
+    plain = client.get("/v1/soulmap/vec").json()
+    assert plain["traits"]["intentVec"] == [0.0] * 768
+
+    packed = client.get("/v1/soulmap/vec", params={"vecFormat": "f16"}).json()
+    assert packed["traits"]["intentVec"]["enc"] == "f16"
+    client.post("/v1/soulmap/delta", json={"playerId": "vec", "choiceId": "battle"})
+    stored = json.loads(DATA_FILE.read_text())["vec"]["intentVec"]
+    assert stored["enc"] == "f16" and stored["dim"] == 768
+
+    assert client.get("/v1/soulmap/vec", params={"vecFormat": "f64"}).status_code == 422
+
+
+def test_reads_do_not_write():
+    client = TestClient(import_app())
+    for i in range(3):
+        assert client.get(f"/v1/soulmap/reader{i}").status_code == 200
+    assert json.loads(DATA_FILE.read_text()) == {}
+
+
+def test_batch_delta_commits_once():
+    spec = importlib.util.spec_from_file_location("soulmap", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    flushes = []
+    real = module.repo.flush
+    module.repo.flush = lambda: flushes.append(1) or real()
+    client = TestClient(module.app)
+
+    resp = client.post("/v1/soulmap/delta/batch", json={"items": [
+        {"playerId": "a", "choiceId": "battle"},
+        {"playerId": "b", "choiceId": "help_npc"},
+        {"playerId": "a", "choiceId": "battle"},
+        {"playerId": "c", "choiceId": "nope"},
+    ]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["applied"] == 3
+    assert [r["ok"] for r in body["results"]] == [True, True, True, False]
+    assert body["results"][0]["summary"].startswith("courage:0.20")
+    assert len(flushes) == 1
+
+    data = json.loads(DATA_FILE.read_text())
+    assert set(data) == {"a", "b"}
+    assert data["b"]["npcTrust"] == {"kaiTrust": 5.0}
+
+
+def test_history_as_of():
+    client = TestClient(import_app())
+    client.post("/v1/soulmap/delta", json={"playerId": "h", "choiceId": "battle"})
+    client.post("/v1/soulmap/delta", json={"playerId": "h", "choiceId": "battle"})
+
+    now = client.get("/v1/soulmap/h/history", params={"asOf": "2999-01-01T00:00:00Z"})
+    assert now.status_code == 200
+    assert now.json()["traits"]["coreVirtues"]["courage"] == pytest.approx(0.2)
+    before = client.get("/v1/soulmap/h/history", params={"asOf": 0})
+    assert before.status_code == 404
+
+
+def test_population_stats():
+    DATA_FILE.write_text(json.dumps({"old": {"coreVirtues": {"courage": 0.5}}}), encoding="utf-8")
+    client = TestClient(import_app())
+    client.post("/v1/soulmap/delta", json={"playerId": "old", "choiceId": "battle"})
+    client.post("/v1/soulmap/delta/batch", json={"items": [
+        {"playerId": "new", "choiceId": "hide"},
+        {"playerId": "old", "choiceId": "battle"},
+    ]})
+    data = client.get("/v1/soulmap/stats").json()
+    assert data["players"] == 2
+    courage = data["sections"]["coreVirtues"]["fields"]["courage"]
+    assert courage["mean"] == pytest.approx((0.7 - 0.1) / 2)
+    assert sum(courage["counts"]) == 2
+    drift = client.get("/v1/soulmap/stats/check").json()
+    assert drift["players"] == drift["counts"] == 0
+
+
+def test_neighbours():
+    DATA_FILE.write_text(json.dumps({
+        "a": {"coreVirtues": {"courage": 0.5}},
+        "b": {"coreVirtues": {"courage": -0.5}},
+    }), encoding="utf-8")
+    client = TestClient(import_app())
+    for _ in range(4):
+        client.post("/v1/soulmap/delta", json={"playerId": "c", "choiceId": "battle"})
+
+    data = client.get("/v1/soulmap/c/neighbours", params={"k": 5}).json()
+    assert [n["playerId"] for n in data["neighbours"]] == ["a", "b"]
+    assert data["neighbours"][0]["distance"] == pytest.approx(0.1)
+    assert client.get("/v1/soulmap/nobody/neighbours").status_code == 404
+    assert client.get("/v1/soulmap/c/neighbours", params={"k": 0}).status_code == 422
+
+
+def test_projection_changes_only_and_etag():
+    client = TestClient(import_app())
+    resp = client.post(
+        "/v1/soulmap/delta",
+        params={"changesOnly": "true"},
+        json={"playerId": "p", "choiceId": "help_npc"},
+    )
+    assert resp.json()["traits"] == {
+        "coreVirtues": {"compassion": pytest.approx(0.2)},
+        "npcTrust": {"kaiTrust": 5.0},
+    }
+
+    slim = client.get("/v1/soulmap/p", params={"fields": "coreVirtues, npcTrust.kaiTrust"})
+    assert set(slim.json()["traits"]) == {"coreVirtues", "npcTrust"}
+    assert client.get("/v1/soulmap/p", params={"fields": "luck"}).status_code == 400
+
+    tag = slim.headers["etag"]
+    again = client.get(
+        "/v1/soulmap/p",
+        params={"fields": "coreVirtues, npcTrust.kaiTrust"},
+        headers={"If-None-Match": tag},
+    )
+    assert again.status_code == 304 and not again.content
+    full = client.get("/v1/soulmap/p", headers={"If-None-Match": tag})
+    assert full.status_code == 200                          # different representation
+    client.post("/v1/soulmap/delta", json={"playerId": "p", "choiceId": "battle"})
+    changed = client.get("/v1/soulmap/p", headers={"If-None-Match": full.headers["etag"]})
+    assert changed.status_code == 200
+
+
+def test_history_starts_from_stored_state():
+    DATA_FILE.write_text(json.dumps({"old": {"coreVirtues": {"courage": 0.5}}}), encoding="utf-8")
+    client = TestClient(import_app())
+    live = client.post("/v1/soulmap/delta", json={"playerId": "old", "choiceId": "battle"})
+    assert live.json()["traits"]["coreVirtues"]["courage"] == pytest.approx(0.6)
+    past = client.get("/v1/soulmap/old/history", params={"asOf": "2999-01-01T00:00:00Z"})
+    assert past.json()["traits"]["coreVirtues"]["courage"] == pytest.approx(0.6)
+
+
+def test_failed_history_append_leaves_the_soul_untouched(monkeypatch):
+    DATA_FILE.write_text(json.dumps({"old": {"coreVirtues": {"courage": 0.5}}}), encoding="utf-8")
+    app = import_app()
+    module = next(r.endpoint.__globals__ for r in app.routes if r.path == "/v1/soulmap/delta")
+    client = TestClient(app, raise_server_exceptions=False)
+
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(module["history"], "record_many", disk_full)
+    resp = client.post("/v1/soulmap/delta", json={"playerId": "old", "choiceId": "battle"})
+    assert resp.status_code == 500
+    soul = client.get("/v1/soulmap/old").json()
+    assert soul["traits"]["coreVirtues"]["courage"] == pytest.approx(0.5)
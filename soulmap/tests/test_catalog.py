@@ -0,0 +1,45 @@
+import json
+import os
+
+import numpy as np
+
+from soulmap.catalog import DeltaCatalog
+from soulmap.model import INDEX
+
+
+def write(path, data, bump=0):
+    path.write_text(json.dumps(data))
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump))
+
+
+def test_compiles_rows_and_hot_reloads(tmp_path):
+    path = tmp_path / "deltas.json"
+    write(path, {"battle": {"coreVirtues": {"courage": 0.1}}})
+    catalog = DeltaCatalog(path, check_interval=0)
+
+    battle = catalog.get("battle")
+    assert battle.traits[INDEX[("coreVirtues", "courage")]] == 0.1
+    compiled = catalog.refresh()
+    assert compiled.matrix.shape[0] == 1
+    assert np.shares_memory(battle.traits, compiled.matrix)
+    assert catalog.get("flee") is None
+
+    write(path, {
+        "battle": {"coreVirtues": {"courage": 0.3}},
+        "flee": {"shadowIndex": {"fear": 0.2}, "npcTrust": {"kai": -5}},
+    }, bump=10**9)
+    assert len(catalog) == 2
+    assert catalog.get("battle").traits[INDEX[("coreVirtues", "courage")]] == 0.3
+    assert dict(catalog.get("flee").npc_trust) == {"kai": -5.0}
+
+
+def test_broken_catalog_keeps_previous_version(tmp_path):
+    path = tmp_path / "deltas.json"
+    write(path, {"battle": {"coreVirtues": {"courage": 0.1}}})
+    catalog = DeltaCatalog(path, check_interval=0)
+
+    write(path, {"battle": {"coreVirtues": {"luck": 1}}}, bump=10**9)
+    assert "battle" in catalog and catalog.get("battle").traits.any()
+    path.write_text("{not json")
+    assert len(catalog) == 1
@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+import pytest
+
+from soulmap.history import SoulMapHistory, decode_delta, encode_delta, rebuild
+from soulmap.model import INDEX, Delta, SoulMap
+
+COURAGE = INDEX[("coreVirtues", "courage")]
+BATTLE = Delta.compile({"coreVirtues": {"courage": 0.1}, "npcTrust": {"kai": 2}})
+
+
+def play(history, live, n, start=1000.0):
+    for k in range(n):
+        live.apply(BATTLE)
+        history.record("hero", "battle", BATTLE, live, ts=start + k)
+
+
+def test_delta_encoding_round_trips():
+    back = decode_delta(json.loads(json.dumps(encode_delta(BATTLE))))
+    assert np.array_equal(back.traits, BATTLE.traits)
+    assert back.npc_trust == {"kai": 2}
+
+
+def test_as_of_uses_snapshot_plus_tail(tmp_path):
+    history = SoulMapHistory(tmp_path, snapshot_every=4)
+    live = SoulMap.default()
+    play(history, live, 10)
+
+    snaps = (tmp_path / "snapshots.jsonl").read_text().splitlines()
+    assert len(snaps) == 2
+    assert history.as_of("hero", 999.0) is None
+    assert np.isclose(history.as_of("hero", 1002.0).traits[COURAGE], 0.3)   # events only
+    assert np.isclose(history.as_of("hero", 1005.0).traits[COURAGE], 0.6)   # snapshot + tail
+    latest = history.as_of("hero")
+    assert np.allclose(latest.traits, live.traits) and latest.npc_trust == live.npc_trust
+    history.close()
+
+
+def test_reopen_recovers_and_truncates_torn_tail(tmp_path):
+    history = SoulMapHistory(tmp_path, snapshot_every=3)
+    live = SoulMap.default()
+    play(history, live, 5)
+    history.close()
+    with open(tmp_path / "events.jsonl", "ab") as fh:
+        fh.write(b'{"q": 99, "t"')                 # crash mid-append
+
+    again = SoulMapHistory(tmp_path, snapshot_every=3)
+    assert np.isclose(again.as_of("hero", 1002.5).traits[COURAGE], 0.3)
+    play(again, live, 1, start=2000.0)            # appends after the truncated tail
+    assert np.allclose(again.as_of("hero").traits, live.traits)
+    assert again.players() == ["hero"]
+    again.close()
+
+
+def test_stored_players_get_a_baseline_and_rebuild_merges(tmp_path):
+    stored = SoulMap.default()
+    stored.traits[COURAGE] = 0.5
+    out = tmp_path / "soul_map.json"
+    out.write_text(json.dumps({"hero": stored.to_json(), "idle": stored.to_json()}))
+
+    history = SoulMapHistory(tmp_path / "history")
+    live = stored.copy()
+    live.apply(BATTLE)
+    history.record("hero", "battle", BATTLE, live, baseline=stored, ts=1000.0)
+    live.apply(BATTLE)
+    history.record("hero", "battle", BATTLE, live, baseline=live, ts=1001.0)  # ignored: has history
+    assert np.isclose(history.as_of("hero", 1000.0).traits[COURAGE], 0.6)
+    assert np.isclose(history.as_of("hero").traits[COURAGE], 0.7)
+    history.close()
+
+    assert rebuild(tmp_path / "history", out) == (1, 2)
+    data = json.loads(out.read_text())
+    assert data["hero"]["coreVirtues"]["courage"] == pytest.approx(0.7)
+    assert data["idle"]["coreVirtues"]["courage"] == 0.5
+
+
+def test_old_records_are_pruned_and_compacted(tmp_path):
+    history = SoulMapHistory(tmp_path, snapshot_every=2, keep_snapshots=2, compact_after=4)
+    live = SoulMap.default()
+    play(history, live, 6)      # snapshots at events 2, 4, 6; the first and events 1-4 go
+    assert len((tmp_path / "snapshots.jsonl").read_text().splitlines()) == 2
+    assert len((tmp_path / "events.jsonl").read_text().splitlines()) == 2
+    assert history.as_of("hero", 1002.0) is None        # before the oldest kept snapshot
+    assert np.isclose(history.as_of("hero", 1004.0).traits[COURAGE], 0.5)
+    assert np.allclose(history.as_of("hero").traits, live.traits)
+    history.close()
+
+    again = SoulMapHistory(tmp_path, snapshot_every=2, keep_snapshots=2)
+    play(again, live, 2, start=1006.0)
+    assert again.as_of("hero", 1004.0) is None
+    assert np.allclose(again.as_of("hero").traits, live.traits)
+    again.close()
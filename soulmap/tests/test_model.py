@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from soulmap.model import INDEX, INTENT_DIMS, N_TRAITS, SHADOWS, Delta, SoulMap, apply_batch
+
+
+def test_delta_is_added_and_clamped_per_section():
+    soul = SoulMap.default()
+    soul.apply(Delta.compile({
+        "coreVirtues": {"courage": 5},
+        "motivations": {"collective": -3},
+        "dynamicStats": {"empathy": 80},
+        "npcTrust": {"kai": 150},
+        "intentVec": [0.5] * INTENT_DIMS,
+    }))
+    assert soul.traits[INDEX[("coreVirtues", "courage")]] == 1.0
+    assert soul.traits[INDEX[("motivations", "collective")]] == 0.0
+    assert soul.traits[INDEX[("dynamicStats", "empathy")]] == 100.0
+    assert soul.npc_trust == {"kai": 100.0}
+    assert np.all(soul.intent == 0.5)
+
+
+def test_json_round_trip_keeps_the_api_shape():
+    soul = SoulMap.default()
+    soul.apply(Delta.compile({"shadowIndex": {"fear": -0.25}, "npcTrust": {"kai": 5}}))
+    data = soul.to_json("list")
+    assert set(data) == {
+        "coreVirtues", "shadowIndex", "motivations", "archetypeResonance",
+        "dynamicStats", "npcTrust", "intentVec",
+    }
+    assert data["shadowIndex"]["fear"] == -0.25
+    assert data["dynamicStats"] == {"resilience": 50.0, "empathy": 50.0}
+    again = SoulMap.from_json(soul.to_json())
+    assert np.array_equal(again.traits, soul.traits) and again.npc_trust == {"kai": 5.0}
+    assert soul.summary().startswith("courage:0.00")
+
+
+def test_unknown_fields_are_rejected_at_compile_time():
+    with pytest.raises(KeyError):
+        Delta.compile({"coreVirtues": {"luck": 1}})
+    with pytest.raises(KeyError):
+        Delta.compile({"mood": {"x": 1}})
+    assert Delta.compile({}).traits.shape == (N_TRAITS,)
+
+
+def test_batch_matches_sequential_application():
+    rng = np.random.default_rng(3)
+    deltas = [
+        Delta.compile({"coreVirtues": {"courage": 0.7}, "npcTrust": {"kai": 60}}),
+        Delta.compile({"coreVirtues": {"courage": -0.4}, "dynamicStats": {"empathy": 30}}),
+        Delta.compile({"motivations": {"collective": 0.6}}),
+    ]
+    ops = [(int(rng.integers(4)), deltas[int(rng.integers(3))]) for _ in range(40)]
+
+    batched = [SoulMap.default() for _ in range(4)]
+    apply_batch(batched, ops)
+    serial = [SoulMap.default() for _ in range(4)]
+    for i, d in ops:
+        serial[i].apply(d)
+
+    for a, b in zip(batched, serial):
+        assert np.allclose(a.traits, b.traits) and a.npc_trust == b.npc_trust
+
+
+def test_projection_and_changes():
+    soul = SoulMap.default()
+    soul.npc_trust["kaiTrust"] = 10.0
+    out = soul.to_json(fields=["coreVirtues.courage", "npcTrust.kaiTrust", "npcTrust.nobody"])
+    assert out == {"coreVirtues": {"courage": 0.0}, "npcTrust": {"kaiTrust": 10.0}}
+    assert set(soul.to_json(fields=["shadowIndex"])["shadowIndex"]) == set(SHADOWS)
+    with pytest.raises(KeyError):
+        soul.to_json(fields=["coreVirtues.luck"])
+
+    before = soul.copy()
+    soul.apply(Delta.compile({"coreVirtues": {"courage": 0.1}, "npcTrust": {"kaiTrust": 5}}))
+    assert soul.changes(before) == {
+        "coreVirtues": {"courage": pytest.approx(0.1)},
+        "npcTrust": {"kaiTrust": 15.0},
+    }
+    assert before.npc_trust["kaiTrust"] == 10.0
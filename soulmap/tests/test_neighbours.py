@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+
+from soulmap.model import INDEX, INTENT_DIMS, LOWER, UPPER, SoulMap
+from soulmap import neighbours
+from soulmap.neighbours import _COLS, NeighbourIndex
+
+
+def soul(rng):
+    return SoulMap(traits=rng.uniform(LOWER, UPPER))
+
+
+def exact(souls, pid, k):
+    rows = {p: s.traits[_COLS] for p, s in souls.items()}
+    dist = {p: float(np.linalg.norm(r - rows[pid])) for p, r in rows.items() if p != pid}
+    return sorted(dist, key=dist.get)[:k]
+
+
+def test_matches_brute_force_through_training_and_updates():
+    rng = np.random.default_rng(3)
+    souls = {f"p{i}": soul(rng) for i in range(600)}
+    index = NeighbourIndex(min_train=200, nprobe=25)     # nprobe ≥ lists → exact
+    for pid, s in souls.items():
+        index.upsert(pid, s)
+    index.wait()
+    assert len(index) == 600 and len(index._centres) > 1
+
+    for pid in rng.choice(list(souls), 100).tolist():      # deltas move rows between lists
+        souls[pid] = soul(rng)
+        index.upsert(pid, souls[pid])
+    assert len(index) == 600
+    assert sum(index._sizes) == 600
+
+    for pid in ["p0", "p1", "p599"]:
+        found = index.query(pid, 5)
+        assert [p for p, _ in found] == exact(souls, pid, 5)
+        assert pid not in {p for p, _ in found}
+
+
+def test_intent_weight_breaks_trait_ties():
+    same = np.zeros(INTENT_DIMS, np.float32)
+    same[0] = 1.0
+    other = np.zeros(INTENT_DIMS, np.float32)
+    other[1] = 1.0
+    souls = {
+        "me": SoulMap(intent=same.copy()),
+        "twin": SoulMap(intent=same * 3),                   # only direction counts
+        "stranger": SoulMap(intent=other),
+    }
+    souls["stranger"].traits[INDEX[("coreVirtues", "courage")]] = -0.01
+
+    plain = NeighbourIndex(source=souls.items)
+    plain.ensure()
+    assert plain.query("me", 2)[0][1] == 0.0
+
+    weighted = NeighbourIndex(intent_weight=1.0, source=souls.items)
+    weighted.ensure()
+    assert [p for p, _ in weighted.query("me", 2)] == ["twin", "stranger"]
+
+
+def test_retrain_runs_in_background_and_keeps_concurrent_writes(monkeypatch):
+    rng = np.random.default_rng(5)
+    release, fitting = threading.Event(), threading.Event()
+    real = neighbours.kmeans
+
+    def slow_kmeans(*args, **kw):
+        fitting.set()
+        release.wait(5)
+        return real(*args, **kw)
+
+    monkeypatch.setattr(neighbours, "kmeans", slow_kmeans)
+    souls = {f"p{i}": soul(rng) for i in range(100)}
+    index = NeighbourIndex(min_train=100, nprobe=50)
+    index.upsert_many(list(souls), list(souls.values()))     # crosses min_train
+    assert fitting.wait(5)
+
+    for pid in ["p0", "p1", "new"]:                         # written mid-fit, not blocked
+        souls[pid] = soul(rng)
+        index.upsert(pid, souls[pid])
+    assert [p for p, _ in index.query("p0", 3)] == exact(souls, "p0", 3)
+
+    release.set()
+    index.wait()
+    assert len(index._centres) > 1 and sum(index._sizes) == 101
+    for pid in ["p0", "new"]:
+        assert [p for p, _ in index.query(pid, 5)] == exact(souls, pid, 5)
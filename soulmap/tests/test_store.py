@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+
+from soulmap.store import SoulMapRepository
+
+
+def fresh():
+    return {"coreVirtues": {"courage": 0.0}}
+
+
+def bump(traits):
+    traits["coreVirtues"]["courage"] += 0.5
+
+
+def test_defaults_are_lazy_and_flush_reuses_clean_fragments(tmp_path, monkeypatch):
+    path = tmp_path / "soul_map.json"
+    path.write_text(json.dumps({"old": {"coreVirtues": {"courage": 0.25}}}))
+    repo = SoulMapRepository(path, fresh)
+
+    assert repo.get("nobody") == fresh()
+    assert "nobody" not in repo and len(repo) == 1
+
+    dumped = []
+    real = json.dumps
+
+    def spy(obj, **kw):
+        dumped.append(obj)
+        return real(obj, **kw)
+
+    monkeypatch.setattr("soulmap.store.json.dumps", spy)
+    repo.update("a", bump)                      # first flush serialises the loaded player once
+    repo.update("a", bump)
+    traits = [d for d in dumped if isinstance(d, dict)]
+    assert traits.count({"coreVirtues": {"courage": 0.25}}) == 1
+
+    on_disk = json.loads(path.read_text())
+    assert on_disk == {"old": {"coreVirtues": {"courage": 0.25}}, "a": {"coreVirtues": {"courage": 1.0}}}
+
+
+def test_interval_mode_batches_until_flush(tmp_path):
+    path = tmp_path / "soul_map.json"
+    repo = SoulMapRepository(path, fresh, flush_interval=60)
+    repo.update("a", bump)
+    repo.update("b", bump)
+    assert not path.exists() and repo.dirty == {"a", "b"}
+    assert repo.flush() == 2 and repo.flush() == 0
+    repo.close()
+
+    again = SoulMapRepository(path, fresh)
+    assert again.get("b") == {"coreVirtues": {"courage": 0.5}}
+
+
+def test_file_is_written_outside_the_lock(tmp_path, monkeypatch):
+    repo = SoulMapRepository(tmp_path / "soul_map.json", fresh)
+    free = []
+    real = os.replace
+
+    def probe():
+        if repo.lock.acquire(timeout=1):
+            free.append(True)
+            repo.lock.release()
+
+    def check(src, dst):
+        t = threading.Thread(target=probe)
+        t.start()
+        t.join()
+        real(src, dst)
+
+    monkeypatch.setattr("soulmap.store.os.replace", check)
+    repo.update("a", bump)
+    assert free == [True]
+    assert json.loads((tmp_path / "soul_map.json").read_text())["a"]["coreVirtues"]["courage"] == 0.5
+
+
+def test_updates_under_the_caller_lock_flush_on_release(tmp_path):
+    path = tmp_path / "soul_map.json"
+    repo = SoulMapRepository(path, fresh)
+    with repo.lock:
+        repo.update("a", bump)
+        with repo.lock:
+            repo.update("b", bump)
+        assert not path.exists() and repo.dirty == {"a", "b"}
+    assert not repo.dirty
+    assert set(json.loads(path.read_text())) == {"a", "b"}
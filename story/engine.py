@@ -2,14 +2,27 @@
 from __future__ import annotations
 
 import json
+import logging
 import time
 from typing import Any, Dict, List
 
 import openai
 import httpx
 
+from common.metrics import REGISTRY, track
+from common.openai_client import Policy, ResilientClient
+
 from .memory import MemoryManager
 
+log = logging.getLogger(__name__)
+
+SCENE_LATENCY = REGISTRY.histogram(
+    "scene_generation_seconds", "End-to-end scene generation time incl. retries."
+)
+
+
+_scene_calls = ResilientClient("story.scene", Policy.from_env("STORY_OPENAI", deadline=20.0))
+
 
 SAFE_SCENE_STUB = {
     "sceneId": "safe_stub",
@@ -53,27 +66,36 @@ def generate_scene(
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt},
     ]
-    retries = 2
+    retries = 2     # for malformed scenes; transport retries live in _scene_calls
     start = time.perf_counter()
     for attempt in range(retries + 1):
         try:
-            resp = client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                response_format={"type": "json_object"},
-            )
+            with track("openai", "scene"):
+                resp = _scene_calls.call(
+                    lambda timeout: client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=messages,
+                        response_format={"type": "json_object"},
+                        timeout=timeout,
+                    )
+                )
+        except Exception:
+            break           # deadline, budget or breaker exhausted: use the stub
+        try:
             scene = json.loads(resp.choices[0].message.content)
             if _validate_scene(scene):
                 latency = time.perf_counter() - start
                 scene["latency"] = latency
+                SCENE_LATENCY.observe(latency, outcome="ok")
                 memory.add_scene(scene)
-                print("scene_gen", json.dumps(scene))
+                log.debug("scene_gen %s", scene)
                 return scene
         except Exception:
             pass
     # fallback
     scene = SAFE_SCENE_STUB | {"latency": time.perf_counter() - start}
-    print("scene_gen", json.dumps(scene))
+    SCENE_LATENCY.observe(scene["latency"], outcome="fallback")
+    log.debug("scene_gen %s", scene)
     return scene
 
 
@@ -8,15 +8,18 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import openai
 
+from common.metrics import instrument
+
 from .engine import generate_scene, log_choice
 from .memory import MemoryManager
 
 app = FastAPI(title="Story Engine")
+instrument(app, "story")
 
 OPENAI_KEY = os.environ.get("OPENAI_API_KEY", "")
 DB_DSN = os.environ.get("STORY_DB_DSN", "postgresql://localhost/story")
 
-client = openai.Client(api_key=OPENAI_KEY)
+client = openai.Client(api_key=OPENAI_KEY, max_retries=0)   # retries: common.openai_client
 
 
 class SceneRequest(BaseModel):
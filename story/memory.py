@@ -6,6 +6,8 @@ from dataclasses import dataclass, field
 from typing import Any, List
 import psycopg
 
+from common.metrics import track
+
 
 @dataclass
 class MemoryManager:
@@ -17,8 +19,9 @@ class MemoryManager:
     _recent: List[dict[str, Any]] = field(default_factory=list)
 
     def __post_init__(self) -> None:
-        self.conn = psycopg.connect(self.dsn)
-        self._ensure_table()
+        with track("postgres", "story_memory_connect"):
+            self.conn = psycopg.connect(self.dsn)
+            self._ensure_table()
 
     # ------------------------------------------------------------------
     def _ensure_table(self) -> None:
@@ -35,7 +38,7 @@ class MemoryManager:
         self._recent.append(scene)
         if len(self._recent) > self.short_window:
             self._recent.pop(0)
-        with self.conn, self.conn.cursor() as cur:
+        with track("postgres", "story_memory_insert"), self.conn, self.conn.cursor() as cur:
             cur.execute(
                 "INSERT INTO story_memory (player_id, scene) VALUES (%s, %s)",
                 (self.player_id, json.dumps(scene)),
@@ -1,3 +1,4 @@
+import json
 import importlib.util
 from pathlib import Path
 from fastapi.testclient import TestClient
@@ -36,3 +37,17 @@ def test_avatar_create():
     assert js["pngUrl"].endswith("tester.png")
     seed_file = AVATAR_DIR / "tester_seed.json"
     assert seed_file.exists()
+
+
+def test_avatar_create_packed_vector():
+    client = TestClient(import_app())
+
+    r = client.post(
+        "/avatar/create?vecFormat=i8", data={"playerId": "packed", "prompt": "sage"}
+    )
+    assert r.status_code == 200
+    vec = r.json()["clipVector"]
+    assert vec["enc"] == "i8" and vec["dim"] == 768
+    stored = json.loads((AVATAR_DIR / "packed_seed.json").read_text())
+    assert stored["version"] == 2
+    assert stored["clipVector"]["enc"] == "f16"
@@ -1,5 +1,6 @@
 from pathlib import Path
 import importlib.util
+import sys
 
 ROOT = Path(__file__).parents[2]
 TRUST_PATH = ROOT / "backend" / "trust.py"
@@ -27,3 +28,13 @@ def test_adjust_decrease(tmp_path):
     tm2.adjust(-3)
     tm3 = TrustManager("bob", path=str(path))
     assert tm3.get() == 2
+
+
+def test_sqlite_backend(tmp_path):
+    sys.path.insert(0, str(ROOT / "backend"))
+    path = tmp_path / "trust.db"
+    TrustManager("carol", path=str(path)).adjust(7)
+    TrustManager("dave", path=str(path)).adjust(-2)
+    assert TrustManager("carol", path=str(path)).get() == 7
+    assert TrustManager("dave", path=str(path)).get() == -2
+    assert TrustManager("erin", path=str(path))._kv is TrustManager("frank", path=str(path))._kv